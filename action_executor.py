@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from collections import deque
+from talon import cron
+from .metrics import metrics
+
+# The longest the executor runs queued actions in one go before giving talon back control
+DRAIN_TIME_BUDGET = 0.008
+
+class ActionMetrics:
+    def __init__(self):
+        self.count = 0
+        self.dropped = 0
+        self.totalWait = 0.0
+        self.maximumWait = 0.0
+        self.totalRun = 0.0
+        self.maximumRun = 0.0
+
+    def record(self, wait: float, run: float):
+        self.count += 1
+        self.totalWait += wait
+        self.maximumWait = max(self.maximumWait, wait)
+        self.totalRun += run
+        self.maximumRun = max(self.maximumRun, run)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "dropped": self.dropped,
+            "mean_wait": self.totalWait/self.count if self.count else 0.0,
+            "max_wait": self.maximumWait,
+            "mean_run": self.totalRun/self.count if self.count else 0.0,
+            "max_run": self.maximumRun,
+        }
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "ran 0, dropped %d"%self.dropped
+        return "ran %d, dropped %d, wait mean %.2fms max %.2fms, run mean %.2fms max %.2fms"%(
+            self.count, self.dropped,
+            self.totalWait/self.count*1000, self.maximumWait*1000,
+            self.totalRun/self.count*1000, self.maximumRun*1000)
+
+class ActionExecutor:
+    def __init__(self, run, maximum_pending_per_source: int = 1):
+        """Runs zone actions outside of the update tick.
+
+        Actions are queued and run in order from a cron.after callback on the talon thread, so a slow action
+        never holds up hover tracking or drawing. Actions marked thread_safe run in order on a worker thread
+        instead, which keeps something like opening a file from blocking talon at all. Each source, usually
+        a zone, can only have a limited number of actions waiting or running; further droppable actions from it
+        are dropped until they finish, so repeating zones cannot pile up work faster than it completes.
+
+        Args:
+            run: The function that performs an action
+            maximum_pending_per_source: How many actions a source may have waiting or running
+        """
+        self.run = run
+        self.maximumPendingPerSource = maximum_pending_per_source
+        self.queue = deque()
+        self.pending = dict()
+        self.metrics = dict()
+        self.job = None
+        self.lock = threading.Lock()
+        self.workerQueue = None
+        self.worker = None
+
+    def submit(self, action, source=None, droppable: bool = True) -> bool:
+        """Queues the action, returns False if it was dropped because its source has too many pending actions"""
+        kind = getattr(action, "kind", "callable")
+        with self.lock:
+            if source is not None:
+                pending = self.pending.get(source, 0)
+                if droppable and pending >= self.maximumPendingPerSource:
+                    self._get_metrics(kind).dropped += 1
+                    if metrics.enabled:
+                        metrics.count("actions dropped")
+                    return False
+                self.pending[source] = pending + 1
+        entry = (action, source, kind, time.perf_counter())
+        if getattr(action, "thread_safe", False):
+            self._get_worker_queue().put(entry)
+        else:
+            self.queue.append(entry)
+            if self.job is None:
+                self.job = cron.after('0ms', self.drain)
+        return True
+
+    def drain(self):
+        self.job = None
+        start = time.perf_counter()
+        while self.queue:
+            self._run_entry(self.queue.popleft())
+            if time.perf_counter() - start >= DRAIN_TIME_BUDGET:
+                break
+        if self.queue and self.job is None:
+            self.job = cron.after('0ms', self.drain)
+
+    def cancel(self):
+        """Drops every queued action, an action the worker thread already started still finishes"""
+        if self.job is not None:
+            cron.cancel(self.job)
+            self.job = None
+        entries = list(self.queue)
+        self.queue.clear()
+        if self.workerQueue is not None:
+            while True:
+                try:
+                    entry = self.workerQueue.get_nowait()
+                except queue.Empty:
+                    break
+                if entry is not None:
+                    entries.append(entry)
+        with self.lock:
+            for _, source, kind, _ in entries:
+                self._release(source)
+                self._get_metrics(kind).dropped += 1
+
+    def shutdown(self):
+        """Drops every queued action and stops the worker thread, a later thread safe action starts a new one"""
+        self.cancel()
+        if self.worker is not None:
+            self.workerQueue.put(None)
+            self.worker = None
+            self.workerQueue = None
+
+    def summary(self) -> list[str]:
+        with self.lock:
+            return ["%s: %s"%(kind, action_metrics.summary()) for kind, action_metrics in sorted(self.metrics.items())]
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {kind: action_metrics.to_dict() for kind, action_metrics in self.metrics.items()}
+
+    def _run_entry(self, entry):
+        action, source, kind, queued = entry
+        started = time.perf_counter()
+        try:
+            self.run(action)
+        finally:
+            finished = time.perf_counter()
+            with self.lock:
+                self._release(source)
+                self._get_metrics(kind).record(started - queued, finished - started)
+                if metrics.enabled:
+                    metrics.record_time("action wait", started - queued)
+                    metrics.record_time("action run", finished - started)
+
+    def _release(self, source):
+        if source is None:
+            return
+        pending = self.pending.get(source, 0) - 1
+        if pending <= 0:
+            self.pending.pop(source, None)
+        else:
+            self.pending[source] = pending
+
+    def _get_metrics(self, kind) -> ActionMetrics:
+        metrics = self.metrics.get(kind)
+        if metrics is None:
+            metrics = ActionMetrics()
+            self.metrics[kind] = metrics
+        return metrics
+
+    def _get_worker_queue(self):
+        if self.worker is None:
+            self.workerQueue = queue.Queue()
+            self.worker = threading.Thread(target=self._work, args=(self.workerQueue,), name="interaction zones actions", daemon=True)
+            self.worker.start()
+        return self.workerQueue
+
+    def _work(self, requests):
+        # None is put on the queue to stop the worker
+        while True:
+            entry = requests.get()
+            if entry is None:
+                return
+            self._run_entry(entry)
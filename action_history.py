@@ -0,0 +1,142 @@
+import json
+import os
+from talon import cron
+
+# How often recorded actions are appended to the log
+FLUSH_INTERVAL = '5s'
+# The log is rewritten with one record per remembered entry once it holds this many times as many records
+COMPACTION_RATIO = 4
+# Logs with fewer records than this are never compacted
+COMPACTION_MINIMUM = 1000
+
+class ActionHistory:
+    def __init__(self, path: str, queues: dict):
+        """Persists recent action queues in an append-only log.
+
+        Recording an action only appends it to a list in memory. The records are appended to the log
+        in batches from a cron interval and are not synced to disk one at a time. Each line of the log
+        holds the queue name, the time of the last use, the use count and the entry as JSON. The log is
+        only read the first time the queues are needed, and rewritten with one line per remembered
+        entry whenever it grows past COMPACTION_RATIO times the remembered entries. A log nothing read
+        yet is compacted once it grows past COMPACTION_RATIO times what the queues can remember.
+
+        Args:
+            path: The log file
+            queues: The recent action queues by the name used for them in the log
+        """
+        self.path = path
+        self.queues = queues
+        self.pending = []
+        self.loaded = False
+        # the number of records in the log file
+        self.recordCount = 0
+        # the size of the log before this session first appended to it, only that part is loaded
+        self.loadLimit = None
+        self.bytesWritten = 0
+        # the bytes of the records this session appended, which tell the size of a record
+        self.bytesAppended = 0
+        self.job = None
+
+    def start(self):
+        if self.job is None:
+            self.job = cron.interval(FLUSH_INTERVAL, self.flush)
+
+    def stop(self):
+        if self.job is not None:
+            cron.cancel(self.job)
+            self.job = None
+        self.flush()
+
+    def record(self, name: str, entry, now: float):
+        self.pending.append((name, now, entry))
+
+    def ensure_loaded(self):
+        """Reads the log into the queues the first time it is called, entries recorded before that stay the most recent"""
+        if self.loaded:
+            return
+        self.loaded = True
+        for name, older in self.read().items():
+            queue = self.queues[name]
+            queue.absorb_older(older)
+
+    def read(self) -> dict:
+        """Returns fresh queues holding the contents of the log"""
+        older = {name: queue.create_empty() for name, queue in self.queues.items()}
+        count = 0
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read(-1 if self.loadLimit is None else self.loadLimit)
+        except FileNotFoundError:
+            data = b""
+        except OSError as ex:
+            print("Failed to read the recent actions history (%s)"%ex)
+            data = b""
+        for line in data.decode("utf-8", errors="replace").splitlines():
+            count += 1
+            try:
+                name, last_use, uses, entry = line.split("\t", 3)
+                older[name].add(json.loads(entry), int(uses), float(last_use))
+            except (ValueError, KeyError):
+                # a line torn by a crash or written by an unknown version
+                continue
+        # records appended by this session were counted as they were written
+        self.recordCount += count
+        return older
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending = self.pending
+        self.pending = []
+        lines = [format_record(name, last_use, 1, entry) for name, last_use, entry in pending]
+        if not self.loaded and self.loadLimit is None:
+            # the queues already hold what is appended from now on
+            try:
+                self.loadLimit = os.path.getsize(self.path)
+            except OSError:
+                self.loadLimit = 0
+        text = "".join(lines)
+        try:
+            self.write(text, "a")
+        except OSError as ex:
+            print("Failed to save the recent actions history (%s)"%ex)
+            return
+        self.recordCount += len(lines)
+        self.bytesAppended += len(text.encode("utf-8"))
+        if self.should_compact():
+            self.compact()
+
+    def should_compact(self) -> bool:
+        if self.loaded:
+            records = self.recordCount
+            remembered = sum(len(queue) for queue in self.queues.values())
+        else:
+            # the records of earlier sessions are estimated from the size of the part of the log not read yet,
+            # and reading it cannot remember more than the queues hold
+            records = self.recordCount + self.loadLimit*self.recordCount/max(self.bytesAppended, 1)
+            remembered = sum(queue.size for queue in self.queues.values())
+        return records > max(COMPACTION_MINIMUM, COMPACTION_RATIO*remembered)
+
+    def compact(self):
+        """Rewrites the log with one record per remembered entry, replacing the old log atomically"""
+        self.ensure_loaded()
+        lines = []
+        for name, queue in self.queues.items():
+            for entry, recent in queue.entries.items():
+                lines.append(format_record(name, recent.lastUse, recent.count, entry))
+        temporary_path = self.path + ".tmp"
+        try:
+            self.write("".join(lines), "w", temporary_path)
+            os.replace(temporary_path, self.path)
+        except OSError as ex:
+            print("Failed to compact the recent actions history (%s)"%ex)
+            return
+        self.recordCount = len(lines)
+
+    def write(self, text: str, mode: str, path: str = None):
+        with open(self.path if path is None else path, mode, encoding="utf-8") as f:
+            f.write(text)
+        self.bytesWritten += len(text.encode("utf-8"))
+
+def format_record(name: str, last_use: float, uses: int, entry) -> str:
+    return "%s\t%.3f\t%d\t%s\n"%(name, last_use, uses, json.dumps(entry, ensure_ascii=False))
@@ -0,0 +1,287 @@
+"""A headless stand-in for the parts of the talon API used by the interaction zones.
+
+Nothing happens on import. Call install() before importing the interaction zones modules to
+register the fake talon modules in sys.modules.
+"""
+import sys
+import types
+from enum import Enum
+
+class Rect:
+    def __init__(self, x=0, y=0, width=0, height=0):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    @property
+    def left(self):
+        return self.x
+
+    @property
+    def top(self):
+        return self.y
+
+    @property
+    def right(self):
+        return self.x + self.width
+
+    @property
+    def bot(self):
+        return self.y + self.height
+
+    @property
+    def center(self):
+        return Point(self.x + self.width/2, self.y + self.height/2)
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def copy(self):
+        return Rect(self.x, self.y, self.width, self.height)
+
+    def __eq__(self, other):
+        return isinstance(other, Rect) and (self.x, self.y, self.width, self.height) == (other.x, other.y, other.width, other.height)
+
+    def __repr__(self):
+        return f"Rect({self.x}, {self.y}, {self.width}, {self.height})"
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+class Paint:
+    class Style(Enum):
+        FILL = 1
+        STROKE = 2
+
+    class TextAlign(Enum):
+        LEFT = 1
+        CENTER = 2
+        RIGHT = 3
+
+    def __init__(self):
+        self.color = "#000000ff"
+        self.textsize = 16
+        self.text_align = Paint.TextAlign.LEFT
+        self.style = Paint.Style.FILL
+
+    def measure_text(self, text):
+        width = len(text) * self.textsize * 0.5
+        return width, Rect(0, -self.textsize, width, self.textsize)
+
+class Image:
+    def __init__(self, width=0, height=0):
+        self.width = width
+        self.height = height
+
+class Screen:
+    def __init__(self, x=0, y=0, width=1920, height=1080):
+        self.rect = Rect(x, y, width, height)
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+class Window:
+    def __init__(self, title=""):
+        self.title = title
+
+class Canvas:
+    def __init__(self, rect):
+        self.rect = rect
+        self.paint = Paint()
+        self.blocks_mouse = False
+        self.callbacks = dict()
+        self.draw_calls = 0
+
+    @classmethod
+    def from_screen(cls, screen):
+        return cls(screen.rect.copy())
+
+    def register(self, name, callback):
+        self.callbacks.setdefault(name, []).append(callback)
+
+    def unregister(self, name, callback):
+        callbacks = self.callbacks.get(name, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def freeze(self):
+        self.render()
+
+    def resume(self):
+        pass
+
+    def show(self):
+        pass
+
+    def hide(self):
+        pass
+
+    def close(self):
+        self.callbacks = dict()
+
+    def render(self):
+        for callback in list(self.callbacks.get("draw", [])):
+            callback(self)
+
+    def draw_rect(self, rect):
+        self.draw_calls += 1
+
+    def draw_text(self, text, x, y):
+        self.draw_calls += 1
+
+    def draw_image(self, image, x, y):
+        self.draw_calls += 1
+
+class Job:
+    def __init__(self, interval, callback, repeating):
+        self.interval = interval
+        self.callback = callback
+        self.repeating = repeating
+        self.cancelled = False
+
+class Cron:
+    def __init__(self):
+        self.jobs = []
+
+    def interval(self, interval, callback):
+        job = Job(interval, callback, True)
+        self.jobs.append(job)
+        return job
+
+    def after(self, interval, callback):
+        job = Job(interval, callback, False)
+        self.jobs.append(job)
+        return job
+
+    def cancel(self, job):
+        if job is None:
+            return
+        job.cancelled = True
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def run_pending_once(self):
+        """Runs every one shot job that has been scheduled so far."""
+        jobs = [job for job in self.jobs if not job.repeating]
+        for job in jobs:
+            self.jobs.remove(job)
+            job.callback()
+
+class Ctrl:
+    def __init__(self):
+        self.position = (0, 0)
+
+    def mouse_pos(self):
+        return self.position
+
+class Namespace:
+    def __init__(self, recorder, prefix):
+        self._recorder = recorder
+        self._prefix = prefix
+        self._functions = dict()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        functions = self.__dict__["_functions"]
+        if name in functions:
+            return functions[name]
+        recorder = self.__dict__["_recorder"]
+        full_name = self.__dict__["_prefix"] + name
+        def record(*args):
+            recorder.append((full_name, args))
+        return record
+
+    def define(self, name, function):
+        self._functions[name] = function
+
+class Actions:
+    def __init__(self):
+        self.calls = []
+        self.user = Namespace(self.calls, "user.")
+        self.code = Namespace(self.calls, "code.")
+        self.code.define("language", lambda: "")
+        self.user.define("get_snippet_names", lambda: [])
+        self.user.define("get_snippet", lambda name: None)
+
+    def key(self, keystroke):
+        self.calls.append(("key", (keystroke,)))
+
+    def insert(self, text):
+        self.calls.append(("insert", (text,)))
+
+class Module:
+    def action_class(self, cls):
+        for name, value in vars(cls).items():
+            if callable(value) and not name.startswith("_"):
+                actions.user.define(name, value)
+        return cls
+
+class App:
+    def __init__(self):
+        self.callbacks = dict()
+
+    def register(self, name, callback):
+        self.callbacks.setdefault(name, []).append(callback)
+
+class UI:
+    def __init__(self):
+        self._screens = [Screen()]
+        self.window = Window()
+        self.callbacks = dict()
+
+    def screens(self):
+        return self._screens
+
+    def main_screen(self):
+        return self._screens[0]
+
+    def active_window(self):
+        return self.window
+
+    def register(self, name, callback):
+        self.callbacks.setdefault(name, []).append(callback)
+
+    def unregister(self, name, callback):
+        callbacks = self.callbacks.get(name, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def dispatch(self, name, *args):
+        for callback in list(self.callbacks.get(name, [])):
+            callback(*args)
+
+actions = Actions()
+app = App()
+cron = Cron()
+ctrl = Ctrl()
+ui = UI()
+
+def install():
+    """Registers the fake talon modules in sys.modules and returns the fake talon module."""
+    if "talon" in sys.modules and getattr(sys.modules["talon"], "IS_FAKE", False):
+        return sys.modules["talon"]
+    talon = types.ModuleType("talon")
+    talon.IS_FAKE = True
+    talon.actions = actions
+    talon.app = app
+    talon.cron = cron
+    talon.ctrl = ctrl
+    talon.ui = ui
+    talon.Module = Module
+    canvas_module = types.ModuleType("talon.canvas")
+    canvas_module.Canvas = Canvas
+    talon.canvas = canvas_module
+    skia = types.ModuleType("talon.skia")
+    skia.Rect = Rect
+    skia.Paint = Paint
+    skia.Image = Image
+    talon.skia = skia
+    sys.modules["talon"] = talon
+    sys.modules["talon.canvas"] = canvas_module
+    sys.modules["talon.skia"] = skia
+    return talon
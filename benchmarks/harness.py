@@ -0,0 +1,76 @@
+"""Loads the interaction zones headlessly on top of the fake talon modules."""
+import importlib
+import os
+import sys
+import tempfile
+import types
+
+from . import fake_talon
+
+PACKAGE_NAME = "interaction_zones"
+REPOSITORY_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_package():
+    """Imports the interaction zones as a package named interaction_zones and returns its master module."""
+    fake_talon.install()
+    if PACKAGE_NAME not in sys.modules:
+        package = types.ModuleType(PACKAGE_NAME)
+        package.__path__ = [REPOSITORY_DIRECTORY]
+        sys.modules[PACKAGE_NAME] = package
+    return importlib.import_module(PACKAGE_NAME + ".master")
+
+def import_module(name: str):
+    load_package()
+    return importlib.import_module(PACKAGE_NAME + "." + name)
+
+def create_zone_directory() -> str:
+    """Creates a temporary zone directory holding copies of the shipped zone files."""
+    directory = tempfile.mkdtemp(prefix="interaction_zones_")
+    source = os.path.join(REPOSITORY_DIRECTORY, "InteractionZones")
+    for name in os.listdir(source):
+        if name.endswith(".txt"):
+            with open(os.path.join(source, name), "r") as f:
+                text = f.read()
+            with open(os.path.join(directory, name), "w") as f:
+                f.write(text)
+    return directory
+
+def generate_zone_text(number_of_zones: int, width: int = 1920, height: int = 1080) -> str:
+    """Creates the text of a zone file with zones laid out on a grid covering the screen."""
+    columns = 1
+    while columns * columns < number_of_zones:
+        columns += 1
+    zone_width = max(width // columns, 1)
+    zone_height = max(height // columns, 1)
+    blocks = []
+    for zone_number in range(number_of_zones):
+        x = (zone_number % columns) * zone_width + zone_width // 2
+        y = (zone_number // columns) * zone_height + zone_height // 2
+        if zone_number % 5 == 0:
+            blocks.append(f"#7aacddff|({x}, {y})\nzone {zone_number}\non hover trigger 1 1\nshift\nctrl\n")
+        else:
+            blocks.append(f"#7aacddff|({x}, {y})\nzone {zone_number}\non hover 1 1\nzone {zone_number} \n")
+    return "\n".join(blocks) + "\n"
+
+def write_zone_file(directory: str, name: str, text: str) -> str:
+    path = os.path.join(directory, name + ".txt")
+    with open(path, "w") as f:
+        f.write(text)
+    return path
+
+def create_master(master_module, directory: str, background_build: bool = False):
+    """Creates a Master reading zone files from the given directory without starting its cron jobs.
+
+    Zone sets are built synchronously unless background_build is set, so they are shown as soon as show returns.
+    """
+    master_module.HOME_DIRECTORY = directory
+    master_module.BACKGROUND_ZONE_SET_BUILD = background_build
+    master = master_module.Master()
+    master_module.master = master
+    return master
+
+def set_mouse_position(x, y):
+    fake_talon.ctrl.position = (x, y)
+
+def set_window_title(title: str):
+    fake_talon.ui.window.title = title
@@ -0,0 +1,186 @@
+"""Replays a recorded interaction zones trace headlessly and faster than real time.
+
+Traces are recorded in talon with "interaction zones record start" and "interaction zones record stop".
+Run from the directory containing the repository with:
+    python -m <repository directory name>.benchmarks.replay TRACE [--zones DIRECTORY] [--expected PATH]
+or directly with:
+    python benchmarks/replay.py TRACE [--zones DIRECTORY] [--expected PATH] [--write-expected PATH] [--json PATH] [--compare PATH]
+
+The zone timers run on a clock that jumps to the time of each record, so the zones fire exactly as they
+did while recording. Every action a zone fires is listed with its time, zone and action. Passing --expected
+with a list written by --write-expected exits with status 1 if the actions differ, which turns a recorded
+session into a regression test. The cost of every update tick is reported like the other benchmarks.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    __package__ = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + ".benchmarks"
+
+# Record times are offset by this so that the zone timers never see times at or below zero
+CLOCK_START = 1000.0
+
+class ReplayClock:
+    def __init__(self):
+        self.time = CLOCK_START
+
+    def __call__(self):
+        return self.time
+
+class MouseEvent:
+    def __init__(self, event, x, y):
+        from .fake_talon import Point
+        self.event = event
+        self.gpos = Point(x, y)
+
+class ReplayResult:
+    def __init__(self):
+        self.fired = []
+        self.tickSeconds = []
+
+def describe_action(action) -> str:
+    text = getattr(action, "text", None)
+    if text is not None:
+        return text.replace("\n", "\\n")
+    return getattr(action, "__qualname__", type(action).__name__)
+
+def record_fired_actions(master, clock, fired: list):
+    """Lists every action submitted to the executor of the master, actions that would leave talon are not run"""
+    submit = master.executor.submit
+    def recording_submit(action, source=None, droppable=True):
+        if getattr(action, "thread_safe", False):
+            accepted = True
+        else:
+            accepted = submit(action, source, droppable)
+        name = getattr(source, "name", "") or ""
+        fired.append("%.3f\t%s\t%s%s"%(clock.time - CLOCK_START, name, describe_action(action), "" if accepted else "\tdropped"))
+        return accepted
+    master.executor.submit = recording_submit
+
+def run_zone_jobs(master):
+    """Runs the queued actions and zone set changes, the scheduler's own ticks are left to the trace"""
+    from .fake_talon import cron
+    callbacks = (master.executor.drain, master.reevaluate_zone_set)
+    while True:
+        jobs = [job for job in cron.jobs if not job.repeating]
+        if not jobs:
+            return
+        for job in jobs:
+            cron.jobs.remove(job)
+        ran = False
+        for job in jobs:
+            if job.callback in callbacks:
+                job.callback()
+                ran = True
+        if not ran:
+            return
+
+def replay(harness, master_module, records, zones_directory) -> ReplayResult:
+    from . import fake_talon
+    pointer_trace = harness.import_module("pointer_trace")
+    timers = harness.import_module("timers")
+    clock = ReplayClock()
+    previous_clock = timers.clock
+    timers.clock = clock
+    result = ReplayResult()
+    try:
+        master = harness.create_master(master_module, zones_directory)
+        record_fired_actions(master, clock, result.fired)
+        for record in records:
+            clock.time = CLOCK_START + record.time
+            kind = record.kind
+            if kind == pointer_trace.TICK:
+                harness.set_mouse_position(record.x, record.y)
+                start = time.perf_counter()
+                master.update()
+                result.tickSeconds.append(time.perf_counter() - start)
+            elif kind == pointer_trace.POINTER:
+                harness.set_mouse_position(record.x, record.y)
+                master.on_mouse(MouseEvent("mousemove", record.x, record.y))
+            elif kind == pointer_trace.MOUSE:
+                harness.set_mouse_position(record.x, record.y)
+                master.on_mouse(MouseEvent(record.event, record.x, record.y))
+            elif kind == pointer_trace.TITLE:
+                harness.set_window_title(record.text)
+                master.on_window_title(record.text)
+            elif kind == pointer_trace.OVERRIDE:
+                # overrides set by replayed zone actions have already been applied
+                override = record.text or None
+                if override != master.overrideZoneSet:
+                    master.set_zone_override(override)
+            elif kind == pointer_trace.VISIBLE:
+                if record.flag != master.showZones:
+                    master.toggle_showing()
+            run_zone_jobs(master)
+        master.hide()
+        run_zone_jobs(master)
+        fake_talon.cron.jobs.clear()
+    finally:
+        timers.clock = previous_clock
+    return result
+
+def report_ticks(report, name, tick_seconds):
+    if not tick_seconds:
+        return
+    report.add(f"{name} ticks", len(tick_seconds), sum(tick_seconds))
+    ordered = sorted(tick_seconds)
+    report.add(f"{name} p99 tick", 1, ordered[min(len(ordered) - 1, int(len(ordered)*0.99))])
+    report.add(f"{name} max tick", 1, ordered[-1])
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Replay an interaction zones trace headlessly")
+    parser.add_argument("trace", help="the trace recorded in talon")
+    parser.add_argument("--zones", help="the directory holding the zone files, defaults to a copy of the shipped ones")
+    parser.add_argument("--expected", help="fail if the fired actions differ from the ones listed in this file")
+    parser.add_argument("--write-expected", help="write the fired actions to this file")
+    parser.add_argument("--json", help="write the tick costs as JSON to this path")
+    parser.add_argument("--compare", help="compare the tick costs against the JSON written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio treated as a regression by --compare")
+    options = parser.parse_args(arguments)
+
+    from . import harness
+    from .run import Report, compare_results
+    master_module = harness.load_package()
+    records = harness.import_module("pointer_trace").read_trace(options.trace)
+    zones_directory = options.zones or harness.create_zone_directory()
+
+    report = Report()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = replay(harness, master_module, records, zones_directory)
+    report_ticks(report, "replay", result.tickSeconds)
+    print(f"{len(records)} records, {len(result.fired)} actions fired")
+
+    passed = True
+    if options.write_expected:
+        with open(options.write_expected, "w", encoding="utf-8") as f:
+            f.writelines(line + "\n" for line in result.fired)
+    if options.expected:
+        with open(options.expected, "r", encoding="utf-8") as f:
+            expected = f.read().splitlines()
+        if expected != result.fired:
+            passed = False
+            print_difference(expected, result.fired)
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(report.results, f, indent=2)
+    if options.compare:
+        with open(options.compare, "r") as f:
+            baseline_results = json.load(f)
+        passed = compare_results(report.results, baseline_results, options.threshold) and passed
+    if not passed:
+        sys.exit(1)
+    return result
+
+def print_difference(expected, fired):
+    import difflib
+    print("The fired actions differ from the expected ones:")
+    for line in difflib.unified_diff(expected, fired, "expected", "replayed", lineterm="", n=2):
+        print(line)
+
+if __name__ == "__main__":
+    main()
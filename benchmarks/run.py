@@ -0,0 +1,806 @@
+"""Benchmarks for the interaction zones hot paths.
+
+Run from the directory containing the repository with:
+    python -m <repository directory name>.benchmarks.run [--quick] [--json PATH] [--compare PATH]
+or directly with:
+    python benchmarks/run.py [--quick] [--json PATH] [--compare PATH]
+
+Passing --compare with the JSON written by an earlier run prints the ratio of every result to
+the earlier one and exits with status 1 if any result got slower than --threshold allows.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    __package__ = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) + ".benchmarks"
+
+ZONE_COUNTS = (10, 100, 1000, 10000)
+QUICK_ZONE_COUNTS = (10, 100, 1000)
+SNIPPET_COUNT = 300
+
+class Report:
+    def __init__(self):
+        self.results = []
+
+    def add(self, name, iterations, seconds, peak_bytes=None, bytes_each=None):
+        result = {
+            "name": name,
+            "iterations": iterations,
+            "mean_us": seconds/iterations*1e6,
+        }
+        if peak_bytes is not None:
+            result["peak_kib"] = peak_bytes/1024
+        if bytes_each is not None:
+            result["bytes_each"] = bytes_each
+        self.results.append(result)
+        print(format_result(result), file=sys.__stdout__, flush=True)
+
+def format_result(result) -> str:
+    text = f"{result['name']:<48} {result['iterations']:>8} x {result['mean_us']:>14.2f} us"
+    if "peak_kib" in result:
+        text += f" {result['peak_kib']:>12.1f} KiB peak"
+    if "bytes_each" in result:
+        text += f" {result['bytes_each']:>12.1f} B each"
+    return text
+
+def compare_results(results, baseline_results, threshold) -> bool:
+    """Prints how the results compare to the baseline and returns True if none regressed past the threshold."""
+    baseline = {result["name"]: result for result in baseline_results}
+    passed = True
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None or previous["mean_us"] <= 0:
+            continue
+        ratio = result["mean_us"]/previous["mean_us"]
+        regressed = ratio > threshold
+        if regressed:
+            passed = False
+        marker = "REGRESSED" if regressed else ""
+        print(f"{result['name']:<48} {ratio:>8.2f}x {marker}")
+    return passed
+
+def time_calls(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return time.perf_counter() - start
+
+def measure_peak_memory(function):
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+def iterations_for(zone_count, budget):
+    return max(3, budget // max(zone_count, 1))
+
+def benchmark_show(report, harness, master_module, directory, zone_counts):
+    master = harness.create_master(master_module, directory)
+    def show(name):
+        master.set_zone_override(name)
+        master.hide()
+        master.show()
+    for name in ["default", ":KEYBOARD", ":KEYBOARD dvorak", ":KEYBOARD numpad", ":SNIPPET", ":OPERATOR", ":RECENT_INSERT"]:
+        show(name)
+        seconds = time_calls(lambda: show(name), 20)
+        peak = measure_peak_memory(lambda: show(name))
+        report.add(f"show {name}", 20, seconds, peak)
+    for zone_count in zone_counts:
+        name = f"generated_{zone_count}"
+        harness.write_zone_file(directory, name, harness.generate_zone_text(zone_count))
+        master.zone_set_directory.invalidate()
+        iterations = iterations_for(zone_count, 20000)
+        seconds = time_calls(lambda: show(name), iterations)
+        peak = measure_peak_memory(lambda: show(name))
+        report.add(f"show {name}", iterations, seconds, peak)
+
+def compute_zone_positions(master):
+    return [zone.centre for zone in master.zones.values()]
+
+def benchmark_ticks(report, harness, master_module, directory, zone_counts):
+    from .fake_talon import Canvas, Rect
+    master = harness.create_master(master_module, directory)
+    canvas = Canvas(Rect(0, 0, 1920, 1080))
+    for zone_count in zone_counts:
+        name = f"generated_{zone_count}"
+        harness.write_zone_file(directory, name, harness.generate_zone_text(zone_count))
+        master.zone_set_directory.invalidate()
+        master.set_zone_override(name)
+        master.hide()
+        master.show()
+        positions = compute_zone_positions(master)
+        iterations = iterations_for(zone_count, 200000)
+
+        harness.set_mouse_position(*positions[0])
+        seconds = time_calls(master.update, iterations)
+        report.add(f"update still {zone_count} zones", iterations, seconds)
+
+        position_index = [0]
+        def moving_update():
+            position_index[0] = (position_index[0] + 1) % len(positions)
+            harness.set_mouse_position(*positions[position_index[0]])
+            master.update()
+        seconds = time_calls(moving_update, iterations)
+        report.add(f"update moving {zone_count} zones", iterations, seconds)
+
+        seconds = time_calls(lambda: master.draw(canvas), iterations)
+        report.add(f"draw {zone_count} zones", iterations, seconds)
+
+        seconds = time_calls(lambda: master.draw_zones(canvas), iterations)
+        report.add(f"draw static layer {zone_count} zones", iterations, seconds)
+
+        # a zone starting or stopping being highlighted, followed by the frame that shows it
+        zone_id = next(iter(master.zones))
+        zone = master.zones[zone_id]
+        renderer = master.primarySurface.layers[0].renderer
+        def highlight_change():
+            zone.sinceInteractedTimer = 0.0 if zone.is_highlighted() else master_module.current_time()
+            master.update_zone(zone_id, master_module.current_time())
+            if renderer.staticDirty:
+                master.draw_zones(canvas)
+            master.draw(canvas)
+        seconds = time_calls(highlight_change, iterations)
+        report.add(f"highlight change and frame {zone_count} zones", iterations, seconds)
+        zone.sinceInteractedTimer = 0.0
+        master.hide()
+
+def benchmark_list_pages(report, harness, master_module, directory):
+    """Flipping through the pages of the snippet list and hovering its zones"""
+    master = harness.create_master(master_module, directory)
+    master.set_zone_override(":SNIPPET")
+    master.hide()
+    master.show()
+    pager = master.listPager
+    iterations = 2000
+    seconds = time_calls(lambda: master.flip_list_page(1), iterations)
+    report.add(f"flip list page ({pager.layout.pageCount} pages, {len(master.zones)} zones)", iterations, seconds)
+
+    positions = compute_zone_positions(master)
+    position_index = [0]
+    def moving_update():
+        position_index[0] = (position_index[0] + 1) % len(positions)
+        harness.set_mouse_position(*positions[position_index[0]])
+        master.update()
+    seconds = time_calls(moving_update, iterations)
+    report.add("update moving list page", iterations, seconds)
+    master.hide()
+
+def benchmark_multiple_screens(report, harness, master_module, directory):
+    """Hover ticks with zones spread over three screens and the cost of a screen change"""
+    from .fake_talon import Screen, ui
+    master = harness.create_master(master_module, directory)
+    single_screen = list(ui._screens)
+    three_screens = [Screen(0, 0, 1920, 1080), Screen(1920, 0, 1920, 1080), Screen(3840, 0, 2560, 1440)]
+    try:
+        ui._screens = three_screens
+        master.update_screens(ui.screens())
+        name = "generated_screens"
+        harness.write_zone_file(directory, name, harness.generate_zone_text(1000, 6400, 1080))
+        master.zone_set_directory.invalidate()
+        master.set_zone_override(name)
+        master.hide()
+        master.show()
+        positions = compute_zone_positions(master)
+        iterations = 2000
+        position_index = [0]
+        def moving_update():
+            position_index[0] = (position_index[0] + 37) % len(positions)
+            harness.set_mouse_position(*positions[position_index[0]])
+            master.update()
+        seconds = time_calls(moving_update, iterations)
+        report.add("update moving 1000 zones on 3 screens", iterations, seconds)
+
+        # the second screen changes resolution, the others keep their surfaces
+        arrangements = [three_screens, [three_screens[0], Screen(1920, 0, 1280, 720), three_screens[2]]]
+        arrangement = [0]
+        def change_screens():
+            arrangement[0] = 1 - arrangement[0]
+            ui._screens = arrangements[arrangement[0]]
+            master.on_screen_change()
+        seconds = time_calls(change_screens, 20)
+        report.add("screen change with 1000 zones", 20, seconds)
+        # a screen change only splits the zones again, triggers stay on and open overlays stay open
+        trigger = next(zone for zone in master.zones.values() if hasattr(zone, "triggerValue"))
+        trigger.triggerValue = True
+        master.set_zone_override(":OPERATOR")
+        master.reevaluate_zone_set()
+        change_screens()
+        if not trigger.triggerValue or len(master.overlays) != 1 or len(master.primarySurface.layers) != 2:
+            raise AssertionError("a screen change reset the shown zones")
+        if any(len(surface.layers) != 2 for surface in master.surfaces):
+            raise AssertionError("a screen change left the screens with different layers")
+        master.set_zone_override(name)
+        master.reevaluate_zone_set()
+        master.hide()
+    finally:
+        ui._screens = single_screen
+        master.update_screens(ui.screens())
+
+class PointerEvent:
+    def __init__(self, x, y):
+        from .fake_talon import Point
+        self.event = "mousemove"
+        self.gpos = Point(x, y)
+
+def benchmark_pointer_jitter(report, harness, master_module, directory):
+    """Feeds pointer samples jittering across the edge of a zone and counts how often its hover restarts"""
+    import random
+    master = harness.create_master(master_module, directory)
+    name = "generated_100"
+    master.set_zone_override(name)
+    master.hide()
+    master.show()
+    zone_id, zone = next(iter(master.zones.items()))
+    edge = zone.left + zone.width
+    random.seed(5)
+    events = [PointerEvent(edge + random.gauss(0, 4), zone.centre[1] + random.gauss(0, 4)) for _ in range(2000)]
+    for margin in (0, master.hoverFilter.margin):
+        master.hoverFilter.margin = margin
+        master.hide()
+        master.show()
+        entries = [0]
+        def count_entries():
+            previous = master.activeID
+            for event in events:
+                master.on_mouse(event)
+                if master.activeID == zone_id and previous != zone_id:
+                    entries[0] += 1
+                previous = master.activeID
+        seconds = time_calls(count_entries, 1)
+        report.add(f"jittery samples with {margin}px exit margin ({entries[0]} hover entries)", len(events), seconds)
+    master.hide()
+
+def benchmark_metrics_overhead(report, harness, master_module, directory):
+    """The cost of a moving tick with metrics off and on"""
+    metrics = harness.import_module("metrics").metrics
+    master = harness.create_master(master_module, directory)
+    master.set_zone_override("generated_100")
+    master.hide()
+    master.show()
+    positions = compute_zone_positions(master)
+    iterations = 5000
+    position_index = [0]
+    def moving_tick():
+        position_index[0] = (position_index[0] + 1) % len(positions)
+        harness.set_mouse_position(*positions[position_index[0]])
+        master.scheduler.tick()
+    for enabled in (False, True):
+        metrics.enabled = enabled
+        seconds = time_calls(moving_tick, iterations)
+        report.add(f"tick with metrics {'on' if enabled else 'off'}", iterations, seconds)
+    metrics.save(os.path.join(directory, "metrics.json"), master.collect_metrics())
+    metrics.enabled = False
+    metrics.reset()
+    master.hide()
+
+def benchmark_swap_round_trip(report, harness, master_module, directory):
+    """Swapping from a 1000 zone file to a 100 zone file and back, with and without parking the file zones"""
+    name = "generated_1000"
+    other = "generated_swap_100"
+    harness.write_zone_file(directory, name, harness.generate_zone_text(1000))
+    harness.write_zone_file(directory, other, harness.generate_zone_text(100))
+    for capacity in (0, master_module.PARKED_ZONE_SET_COUNT):
+        master = harness.create_master(master_module, directory)
+        master.zoneSetPool = master_module.ZoneSetPool(capacity, True, False)
+        master.zone_set_directory.invalidate()
+        master.set_zone_override(name)
+        master.hide()
+        master.show()
+        trigger_id, trigger = next((zone_id, zone) for zone_id, zone in master.zones.items() if hasattr(zone, "triggerValue"))
+        trigger.triggerValue = True
+        def swap(override):
+            master.set_zone_override(override)
+            master.reevaluate_zone_set()
+        def round_trip():
+            swap(other)
+            swap(name)
+        iterations = 50
+        seconds = time_calls(round_trip, iterations)
+        kept = master.zones.get(trigger_id) is trigger and trigger.triggerValue
+        if capacity and not kept:
+            raise AssertionError("swapping back to a parked zone set lost the trigger value")
+        report.add(f"swap to 100 zone file and back, {capacity} parked", iterations, seconds)
+        master.hide()
+
+def benchmark_overlays(report, harness, master_module, directory):
+    """Opening and closing the operator popup over a 1000 zone file, against replacing the file zones with it"""
+    name = "generated_1000"
+    harness.write_zone_file(directory, name, harness.generate_zone_text(1000))
+    master = harness.create_master(master_module, directory)
+    master.zone_set_directory.invalidate()
+    master.set_zone_override(name)
+    master.hide()
+    master.show()
+    base_layer = master.primarySurface.layers[0]
+    trigger_id, trigger = next((zone_id, zone) for zone_id, zone in master.zones.items() if hasattr(zone, "triggerValue"))
+    trigger.triggerValue = True
+    def swap(override):
+        master.set_zone_override(override)
+        master.reevaluate_zone_set()
+    def open_and_close():
+        swap(":OPERATOR")
+        swap(name)
+    iterations = 200
+    # a zone of the file is hovered when the popup opens
+    harness.set_mouse_position(*master.zones[trigger_id].centre)
+    master.update()
+    swap(":OPERATOR")
+    opened = len(master.overlays) == 1 and any(isinstance(zone_id, tuple) for zone_id in master.zones)
+    # the zone file must not be reachable through the gaps between the zones of the popup
+    surface = master.primarySurface
+    left, top, right, bottom = surface.layers[-1].bounds
+    found = {master.query_zone(x, y, surface) for x in range(left, right, 4) for y in range(top, bottom, 4)}
+    reached = [zone_id for zone_id in found if not isinstance(zone_id, tuple) and zone_id != master_module.TRANSPARENT]
+    suspended = len(master.timers) == 0 or all(isinstance(zone_id, tuple) for zone_id in master.timers.deadlines)
+    # the zone file is drawn on a canvas of its own, the popup has to cover it
+    rects = []
+    surface.canvas.draw_rect = rects.append
+    surface.render_overlay(surface.canvas)
+    del surface.canvas.draw_rect
+    covered = surface.layers[-1].backdrop in rects
+    swap(name)
+    if not opened or master.overlays:
+        raise AssertionError("the operator popup was not shown as an overlay")
+    if reached:
+        raise AssertionError(f"{len(reached)} points around the operator popup reached the zone file below it")
+    if not suspended:
+        raise AssertionError("zones of the zone file kept their timers under the operator popup")
+    if not covered:
+        raise AssertionError("the zone file showed through the operator popup")
+    seconds = time_calls(open_and_close, iterations)
+    if master.primarySurface.layers[0] is not base_layer or master.zones.get(trigger_id) is not trigger or not trigger.triggerValue:
+        raise AssertionError("opening an overlay touched the zone file below it")
+    report.add("open and close operator over 1000 zones", iterations, seconds)
+    def replace_and_restore():
+        master.set_zone_override(":OPERATOR")
+        master.publish_zone_set(master.build_special_zone_set())
+        swap(name)
+    seconds = time_calls(replace_and_restore, iterations)
+    report.add("replace 1000 zones with operator and back", iterations, seconds)
+    master.hide()
+
+def benchmark_hot_reload(report, harness, master_module, directory):
+    """Applying an edit that moves one zone of a shown 1000 zone file, against hiding and showing it again"""
+    name = "generated_reload"
+    texts = [harness.generate_zone_text(1000), harness.generate_zone_text(1000).replace("(90, 16)", "(100, 26)", 1)]
+    path = harness.write_zone_file(directory, name, texts[0])
+    master = harness.create_master(master_module, directory)
+    master.zone_set_directory.invalidate()
+    master.set_zone_override(name)
+    master.hide()
+    master.show()
+    trigger_id, trigger = next((zone_id, zone) for zone_id, zone in master.zones.items() if hasattr(zone, "triggerValue"))
+    trigger.triggerValue = True
+    iterations = 50
+    version = [0]
+    def edit():
+        version[0] += 1
+        with open(path, "w") as f:
+            f.write(texts[version[0] % 2])
+        # the modification time alone may not change between quick edits
+        os.utime(path, ns=(version[0], version[0]))
+    def reload():
+        edit()
+        master.reload_zone_file()
+    seconds = time_calls(reload, iterations)
+    if master.zones.get(trigger_id) is not trigger or not trigger.triggerValue:
+        raise AssertionError("reloading the zone file replaced a zone that was not edited")
+    report.add("hot reload moved zone of 1000", iterations, seconds)
+    def show():
+        edit()
+        master.hide()
+        master.show()
+    seconds = time_calls(show, iterations)
+    report.add("hide and show edited 1000 zones", iterations, seconds)
+    master.hide()
+
+def wait_for_zone_set(master, on_wait):
+    """Publishes the zone set built in the background once it is ready, calling on_wait until then"""
+    from .fake_talon import cron
+    builder = master.zoneSetBuilder
+    while builder.is_pending():
+        for job in [job for job in cron.jobs if job.callback == builder._publish_results]:
+            cron.jobs.remove(job)
+            on_wait(job.callback)
+        on_wait(None)
+
+def benchmark_background_build(report, harness, master_module, directory):
+    """The longest the talon thread is held up while switching to an edited 5000 zone file, updating the zones meanwhile"""
+    name = "generated_background"
+    path = harness.write_zone_file(directory, name, harness.generate_zone_text(5000))
+    iterations = 5
+    for background in (False, True):
+        master = harness.create_master(master_module, directory, background)
+        master.zone_set_directory.invalidate()
+        master.set_zone_override("generated_100")
+        master.hide()
+        master.show()
+        wait_for_zone_set(master, lambda callback: callback and callback())
+        positions = compute_zone_positions(master)
+        longest = [0.0]
+        updates = [0]
+        def timed(function):
+            start = time.perf_counter()
+            function()
+            longest[0] = max(longest[0], time.perf_counter() - start)
+        def on_wait(callback):
+            if callback is not None:
+                timed(callback)
+                return
+            harness.set_mouse_position(*positions[updates[0] % len(positions)])
+            updates[0] += 1
+            timed(master.update)
+            time.sleep(0.001)
+        def switch(version):
+            os.utime(path, ns=(version, version))
+            master.set_zone_override(name if version % 2 else "generated_100")
+            timed(master.reevaluate_zone_set)
+            wait_for_zone_set(master, on_wait)
+        seconds = time_calls(lambda: switch(updates[0] + 1), iterations*2)
+        report.add(f"switch files of 5000 and 100 zones {'in background' if background else 'synchronously'}", iterations*2, seconds)
+        report.add(f"longest stall {'in background' if background else 'synchronously'} ({updates[0]} updates meanwhile)", 1, longest[0])
+        master.hide()
+
+def benchmark_record_replay(report, harness, master_module, directory):
+    """Records a session of dwelling on zones, replays the trace and checks it fires the same actions"""
+    import random
+    from . import replay
+    timers = harness.import_module("timers")
+    pointer_trace = harness.import_module("pointer_trace")
+    clock = replay.ReplayClock()
+    previous_clock = timers.clock
+    timers.clock = clock
+    fired = []
+    path = os.path.join(directory, "session.trace")
+    try:
+        master = harness.create_master(master_module, directory)
+        replay.record_fired_actions(master, clock, fired)
+        master.start_recording(path)
+        master.set_zone_override("generated_100")
+        master.toggle_showing()
+        replay.run_zone_jobs(master)
+        random.seed(7)
+        positions = compute_zone_positions(master)
+        for visit in range(8):
+            x, y = positions[(visit*13) % len(positions)]
+            for tick in range(150):
+                clock.time += 0.016
+                if tick % 3 == 0:
+                    master.on_mouse(PointerEvent(x + random.gauss(0, 3), y + random.gauss(0, 3)))
+                harness.set_mouse_position(x, y)
+                master.update()
+                replay.run_zone_jobs(master)
+            if visit % 3 == 0:
+                master.on_mouse(replay.MouseEvent("mouseup", x, y))
+                replay.run_zone_jobs(master)
+        master.toggle_showing()
+        master.stop_recording()
+        harness.fake_talon.cron.jobs.clear()
+    finally:
+        timers.clock = previous_clock
+    records = pointer_trace.read_trace(path)
+    result = replay.replay(harness, master_module, records, directory)
+    if result.fired != fired:
+        raise AssertionError("replaying the recorded session fired different actions")
+    replay.report_ticks(report, f"replayed session ({len(fired)} actions)", result.tickSeconds)
+
+def benchmark_zone_memory(report, harness, zone_counts):
+    config_parser = harness.import_module("config_parser")
+    for zone_count in zone_counts:
+        specs = [config_parser.parse_zone_spec(block) for block in harness.generate_zone_text(zone_count).split("\n\n") if block.strip()]
+        zones = []
+        tracemalloc.start()
+        try:
+            start = time.perf_counter()
+            for spec in specs:
+                zones.append(config_parser.create_zone(spec))
+            seconds = time.perf_counter() - start
+            current, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        report.add(f"create zone ({zone_count} zones)", len(specs), seconds, bytes_each=current/len(specs))
+
+def benchmark_tick_allocations(report, harness, master_module, directory, zone_counts):
+    """Reports the peak transient memory of a tick and the blocks still allocated after it"""
+    master = harness.create_master(master_module, directory)
+    for zone_count in zone_counts:
+        name = f"generated_{zone_count}"
+        master.set_zone_override(name)
+        master.hide()
+        master.show()
+        positions = compute_zone_positions(master)
+        iterations = 1000
+        position_index = [0]
+        def moving_update():
+            position_index[0] = (position_index[0] + 1) % len(positions)
+            harness.set_mouse_position(*positions[position_index[0]])
+            master.update()
+        moving_update()
+        tracemalloc.start()
+        try:
+            blocks = sys.getallocatedblocks()
+            seconds = time_calls(moving_update, iterations)
+            blocks = sys.getallocatedblocks() - blocks
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        report.add(f"tick allocations {zone_count} zones ({blocks/iterations:.2f} net blocks/tick)", iterations, seconds, peak)
+        master.hide()
+
+def legacy_parse_zone(zones, helpers, data):
+    """The parse_zone used before the streaming parser, kept for comparison"""
+    try:
+        l = data.split("\n")
+        
+        if l[0][0]=='#':
+            data = l[0].replace("\n",'').split('|')
+            color = data[0]
+            xy = data[1].replace('(','').replace(')','').split(',')
+            centre=(float(xy[0]),float(xy[1]))
+        else:
+            raise Exception("failed to get zone color")
+            
+        i = 1
+            
+        name = l[i]
+
+        if l[i+1].lower()[:8]=="on hover":
+            triggerType=helpers.TriggerType.HOVER
+        elif l[i+1].lower()[:8]=="on click":
+            triggerType=helpers.TriggerType.CLICK
+        else:
+            raise Exception("failed to parse zone type")
+        
+        if l[i+1].lower()[9:16]=="trigger":
+            action=l[i+2]
+            action2=l[i+3]
+            zoneType = helpers.ZoneType.TRIGGER
+        else:
+            action=l[i+2]
+            zoneType = helpers.ZoneType.SIMPLE
+        
+        timeLoc = 17 if zoneType == helpers.ZoneType.TRIGGER else 9
+        timings = l[i+1].lower()[timeLoc:]
+        timing_phrases = timings.split(' ')
+        warmup=0
+        repeatTime=0
+        if len(timing_phrases) >= 1:
+            if helpers.is_float(timing_phrases[0]):
+                warmup=float(timing_phrases[0])
+        if len(timing_phrases) >= 2:
+            if helpers.is_float(timing_phrases[1]):
+                repeatTime=float(timing_phrases[1])
+            
+        modifiers=""
+        elen = 6 if zoneType == helpers.ZoneType.TRIGGER else 5
+        if len(l)>=elen:
+            modifiers=l[elen-1]
+            
+        if zoneType==helpers.ZoneType.TRIGGER:
+            return zones.TriggerZone(color,centre,name,triggerType,action,warmup,repeatTime,modifiers,action2)
+        if zoneType==helpers.ZoneType.SIMPLE:
+            return zones.SimpleZone(color,centre,name,triggerType,action,warmup,repeatTime,modifiers)
+    
+    except Exception as ex:
+        print(str(ex))
+        return None
+
+def legacy_parse_file(zones, helpers, path):
+    """The file parsing loop used before the streaming parser, kept for comparison"""
+    parsed = []
+    with open(path, "r") as f:
+        lines = f.readlines()
+        lines.append(" ")
+        ss = ""
+        for s in lines:
+            if s[0]=='#':
+                ss = s
+            elif not s.isspace():
+                ss += s
+            else:
+                z = legacy_parse_zone(zones, helpers, ss)
+                if z != None:
+                    parsed.append(z)
+    return parsed
+
+def benchmark_parse(report, harness, directory, zone_counts):
+    config_parser = harness.import_module("config_parser")
+    zones = harness.import_module("zones")
+    helpers = harness.import_module("helpers")
+    blocks = [block for block in harness.generate_zone_text(1000).split("\n\n") if block.strip()]
+    def legacy_parse_all():
+        for block in blocks:
+            legacy_parse_zone(zones, helpers, block)
+    def parse_all():
+        for block in blocks:
+            config_parser.parse_zone(block)
+    iterations = 20
+    seconds = time_calls(legacy_parse_all, iterations)
+    report.add("legacy parse_zone", iterations*len(blocks), seconds)
+    seconds = time_calls(parse_all, iterations)
+    report.add("parse_zone", iterations*len(blocks), seconds)
+
+    for zone_count in tuple(zone_counts) + (zone_counts[-1]*5,):
+        path = harness.write_zone_file(directory, f"parse_{zone_count}", harness.generate_zone_text(zone_count))
+        iterations = max(1, 20000 // zone_count)
+        seconds = time_calls(lambda: legacy_parse_file(zones, helpers, path), iterations)
+        peak = measure_peak_memory(lambda: legacy_parse_file(zones, helpers, path))
+        report.add(f"legacy parse file {zone_count} zones", iterations*zone_count, seconds, peak)
+        seconds = time_calls(lambda: [config_parser.create_zone(spec) for spec in config_parser.parse_zone_file(path)], iterations)
+        peak = measure_peak_memory(lambda: [config_parser.create_zone(spec) for spec in config_parser.parse_zone_file(path)])
+        report.add(f"streaming parse file {zone_count} zones", iterations*zone_count, seconds, peak)
+        def count_specs():
+            with open(path, "r") as f:
+                return sum(1 for _ in config_parser.iter_zone_specs(config_parser.iter_lines(f)))
+        seconds = time_calls(count_specs, iterations)
+        peak = measure_peak_memory(count_specs)
+        report.add(f"streaming specs only {zone_count} zones", iterations*zone_count, seconds, peak)
+
+class LegacyActionQueue:
+    """The recent actions queue used before the frecency store, kept for comparison"""
+    def __init__(self, size):
+        self.size = size
+        self.queue = deque()
+
+    def insert(self, entry):
+        if entry in self.queue:
+            self.queue.remove(entry)
+        self.queue.appendleft(entry)
+        if len(self.queue) > self.size:
+            self.queue.pop()
+
+    def get_items(self):
+        return sorted([i for i in self.queue])
+
+def benchmark_recent_actions(report, harness):
+    recent_actions = harness.import_module("recent_actions")
+    for capacity in (100, 1000, 10000):
+        entries = [f"text {number}" for number in range(capacity*2)]
+        for name, queue in (("legacy", LegacyActionQueue(capacity)), ("frecency", recent_actions.ActionQueue(capacity))):
+            for entry in entries:
+                queue.insert(entry)
+            position = [0]
+            def insert():
+                # alternates between remembered and new entries
+                position[0] = (position[0] + 7) % len(entries)
+                queue.insert(entries[position[0]])
+            iterations = 20000 if name == "frecency" or capacity <= 1000 else 200
+            seconds = time_calls(insert, iterations)
+            report.add(f"{name} recent insert (capacity {capacity})", iterations, seconds)
+            seconds = time_calls(queue.get_items, 20)
+            report.add(f"{name} recent items (capacity {capacity})", 20, seconds)
+
+def simulate_history_session(recent_actions, action_history, path, action_count, vocabulary, load=True):
+    """Records a session of inserts drawn mostly from a small vocabulary, flushing every 50 actions.
+
+    Unless load is set nothing asks for the queues, like a session in which no recent actions popup is opened.
+    """
+    queue = recent_actions.ActionQueue(1000)
+    history = action_history.ActionHistory(path, {"insert": queue})
+    if load:
+        history.ensure_loaded()
+    logical_bytes = 0
+    for number in range(action_count):
+        # a few entries are used over and over, the rest rarely
+        entry = vocabulary[(number*number) % len(vocabulary)] if number % 4 else f"once {number}"
+        now = 1e9 + number
+        queue.insert(entry, now)
+        history.record("insert", entry, now)
+        logical_bytes += len(action_history.format_record("insert", now, 1, entry).encode("utf-8"))
+        if number % 50 == 49:
+            history.flush()
+    history.flush()
+    return history, logical_bytes
+
+def benchmark_action_history(report, harness, directory):
+    recent_actions = harness.import_module("recent_actions")
+    action_history = harness.import_module("action_history")
+    vocabulary = [f"word {number}" for number in range(200)]
+
+    queue = recent_actions.ActionQueue(1000)
+    history = action_history.ActionHistory(os.path.join(directory, "hot_path.log"), {"insert": queue})
+    position = [0]
+    def record():
+        position[0] = (position[0] + 1) % len(vocabulary)
+        entry = vocabulary[position[0]]
+        queue.insert(entry, 1e9)
+        history.record("insert", entry, 1e9)
+    iterations = 20000
+    seconds = time_calls(record, iterations)
+    report.add("record recent insert with history", iterations, seconds)
+    history.pending.clear()
+
+    for action_count in (1000, 10000, 50000):
+        path = os.path.join(directory, f"history_{action_count}.log")
+        if os.path.exists(path):
+            os.remove(path)
+        start = time.perf_counter()
+        history, logical_bytes = simulate_history_session(recent_actions, action_history, path, action_count, vocabulary)
+        seconds = time.perf_counter() - start
+        amplification = history.bytesWritten/logical_bytes
+        report.add(f"history session {action_count} actions ({amplification:.2f}x write amplification, {os.path.getsize(path)//1024} KiB log)", action_count, seconds)
+
+        def load():
+            loaded = action_history.ActionHistory(path, {"insert": recent_actions.ActionQueue(1000)})
+            loaded.ensure_loaded()
+        iterations = 10
+        seconds = time_calls(load, iterations)
+        report.add(f"load history after {action_count} actions", iterations, seconds)
+
+    # sessions that never open a recent actions popup still keep the log compacted
+    path = os.path.join(directory, "history_unloaded.log")
+    if os.path.exists(path):
+        os.remove(path)
+    session_count = 5
+    action_count = 20000
+    start = time.perf_counter()
+    for _ in range(session_count):
+        history, _ = simulate_history_session(recent_actions, action_history, path, action_count, vocabulary[:50], load=False)
+    seconds = time.perf_counter() - start
+    with open(path, "rb") as f:
+        record_count = sum(1 for _ in f)
+    if record_count > action_history.COMPACTION_RATIO*1000 + action_count:
+        raise AssertionError(f"the history log of sessions that never loaded it grew to {record_count} records")
+    report.add(f"history {session_count} unloaded sessions of {action_count} actions ({record_count} records, {os.path.getsize(path)//1024} KiB log)", session_count*action_count, seconds)
+
+def configure_snippets(fake_talon):
+    names = [f"snippet_{number}" for number in range(SNIPPET_COUNT)]
+    fake_talon.actions.user.define("get_snippet_names", lambda: list(names))
+    fake_talon.actions.user.define("get_snippet", lambda name: {"body": name})
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Benchmark the interaction zones hot paths headlessly")
+    parser.add_argument("--quick", action="store_true", help="skip the 10000 zone sizes")
+    parser.add_argument("--json", help="write the results as JSON to this path")
+    parser.add_argument("--compare", help="compare the results against the JSON written by an earlier run")
+    parser.add_argument("--threshold", type=float, default=1.5, help="slowdown ratio treated as a regression by --compare")
+    options = parser.parse_args(arguments)
+
+    from . import harness, fake_talon
+    master_module = harness.load_package()
+    configure_snippets(fake_talon)
+    directory = harness.create_zone_directory()
+    zone_counts = QUICK_ZONE_COUNTS if options.quick else ZONE_COUNTS
+
+    report = Report()
+    # The zones print diagnostics while loading, keep them out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        benchmark_show(report, harness, master_module, directory, zone_counts)
+        benchmark_ticks(report, harness, master_module, directory, zone_counts)
+        benchmark_tick_allocations(report, harness, master_module, directory, zone_counts)
+        benchmark_list_pages(report, harness, master_module, directory)
+        benchmark_multiple_screens(report, harness, master_module, directory)
+        benchmark_pointer_jitter(report, harness, master_module, directory)
+        benchmark_metrics_overhead(report, harness, master_module, directory)
+        benchmark_record_replay(report, harness, master_module, directory)
+        benchmark_swap_round_trip(report, harness, master_module, directory)
+        benchmark_overlays(report, harness, master_module, directory)
+        benchmark_hot_reload(report, harness, master_module, directory)
+        benchmark_background_build(report, harness, master_module, directory)
+        benchmark_zone_memory(report, harness, zone_counts)
+        benchmark_parse(report, harness, directory, zone_counts)
+        benchmark_recent_actions(report, harness)
+        benchmark_action_history(report, harness, directory)
+
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(report.results, f, indent=2)
+    if options.compare:
+        with open(options.compare, "r") as f:
+            baseline_results = json.load(f)
+        if not compare_results(report.results, baseline_results, options.threshold):
+            sys.exit(1)
+    return report
+
+if __name__ == "__main__":
+    main()
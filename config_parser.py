@@ -1,5 +1,33 @@
+from typing import NamedTuple, Iterable, Iterator
 from .zones import Zone, TriggerZone,SimpleZone
-from .helpers import is_float,TriggerType,ZoneType
+from .helpers import TriggerType,ZoneType
+from .zone_actions import compile_action
+
+# Zone files are read this many characters at a time
+READ_CHUNK_SIZE = 1 << 14
+# lines starting with one of these may be blank
+WHITESPACE = " \t\r\n\f\v"
+
+class ZoneSpec(NamedTuple):
+    """The parsed contents of a zone block, used to create any number of fresh zones"""
+    zoneType: ZoneType
+    color: str
+    centre: tuple
+    name: str
+    triggerType: TriggerType
+    action: str
+    action2: str
+    warmup: float
+    repeatTime: float
+    modifiers: str
+
+class ZoneParseError(Exception):
+    def __init__(self, message: str, line_number: int):
+        super().__init__(message)
+        self.line_number = line_number
+
+    def __str__(self):
+        return "line %d: %s"%(self.line_number, self.args[0])
 
 def is_line_newzone(l:str) -> bool:
     return l[0]=='#'
@@ -8,60 +36,143 @@ def is_line_endzone(l:str) -> bool:
     return l.isspace()
 
 def parse_zone(data:str) -> Zone:
-    
+    spec = parse_zone_spec(data)
+    if spec is None:
+        return None
+    return create_zone(spec)
+
+def create_zone(spec: ZoneSpec) -> Zone:
+    if spec.zoneType==ZoneType.TRIGGER:
+        return TriggerZone(spec.color,spec.centre,spec.name,spec.triggerType,spec.action,spec.warmup,spec.repeatTime,spec.modifiers,spec.action2)
+    return SimpleZone(spec.color,spec.centre,spec.name,spec.triggerType,spec.action,spec.warmup,spec.repeatTime,spec.modifiers)
+
+def parse_zone_spec(data:str) -> ZoneSpec:
     try:
-        l = data.split("\n")
-        
-        if l[0][0]=='#':
-            data = l[0].replace("\n",'').split('|')
-            color = data[0]
-            xy = data[1].replace('(','').replace(')','').split(',')
-            centre=(float(xy[0]),float(xy[1]))
-        else:
-            raise Exception("failed to get zone color")
-            
-        i = 1
-            
-        name = l[i]
-
-        if l[i+1].lower()[:8]=="on hover":
-            triggerType=TriggerType.HOVER
-        elif l[i+1].lower()[:8]=="on click":
-            triggerType=TriggerType.CLICK
-        else:
-            raise Exception("failed to parse zone type")
-        
-        if l[i+1].lower()[9:16]=="trigger":
-            action=l[i+2]
-            action2=l[i+3]
-            zoneType = ZoneType.TRIGGER
-        else:
-            action=l[i+2]
-            zoneType = ZoneType.SIMPLE
-        
-        timeLoc = 17 if zoneType == ZoneType.TRIGGER else 9
-        timings = l[i+1].lower()[timeLoc:]
-        timing_phrases = timings.split(' ')
-        warmup=0
-        repeatTime=0
-        if len(timing_phrases) >= 1:
-            if is_float(timing_phrases[0]):
-                warmup=float(timing_phrases[0])
-        if len(timing_phrases) >= 2:
-            if is_float(timing_phrases[1]):
-                repeatTime=float(timing_phrases[1])
-            
-        modifiers=""
-        elen = 6 if zoneType == ZoneType.TRIGGER else 5
-        if len(l)>=elen:
-            modifiers=l[elen-1]
-            
-        if zoneType==ZoneType.TRIGGER:
-            return TriggerZone(color,centre,name,triggerType,action,warmup,repeatTime,modifiers,action2)
-        if zoneType==ZoneType.SIMPLE:
-            return SimpleZone(color,centre,name,triggerType,action,warmup,repeatTime,modifiers)
-    
-    except Exception as ex:
+        return parse_zone_lines(data.split("\n"), 1)
+    except ZoneParseError as ex:
         print(str(ex))
         return None
-    pass
+
+def parse_zone_lines(l:list[str], first_line_number:int) -> ZoneSpec:
+    """Parses the lines of one zone block, raising ZoneParseError with the number of the offending line.
+
+    A block missing only its last action line reads it as empty, as zone files written for the first
+    parser rely on that.
+    """
+    count = len(l)
+    header = l[0] if count else ""
+    if not header or header[0]!='#':
+        raise ZoneParseError("failed to get zone color", first_line_number)
+    try:
+        data = header.split('|')
+        color = data[0]
+        xy = data[1].replace('(','').replace(')','').split(',')
+        centre=(float(xy[0]),float(xy[1]))
+    except (IndexError, ValueError):
+        raise ZoneParseError("failed to parse zone centre from '%s'"%header, first_line_number)
+
+    if count < 3:
+        raise ZoneParseError("zone block ended early", first_line_number + count - 1)
+    name = l[1]
+
+    behaviour = l[2].lower()
+    if behaviour[:8]=="on hover":
+        triggerType=TriggerType.HOVER
+    elif behaviour[:8]=="on click":
+        triggerType=TriggerType.CLICK
+    else:
+        raise ZoneParseError("failed to parse zone type from '%s'"%l[2], first_line_number + 2)
+
+    if behaviour[9:16]=="trigger":
+        if count < 4:
+            raise ZoneParseError("zone block ended early", first_line_number + count - 1)
+        action=l[3]
+        action2=l[4] if count > 4 else ""
+        zoneType = ZoneType.TRIGGER
+    else:
+        action=l[3] if count > 3 else ""
+        action2=None
+        zoneType = ZoneType.SIMPLE
+
+    timeLoc = 17 if zoneType == ZoneType.TRIGGER else 9
+    timing_phrases = behaviour[timeLoc:].split(' ')
+    warmup=parse_time(timing_phrases[0])
+    repeatTime=parse_time(timing_phrases[1]) if len(timing_phrases) >= 2 else 0
+
+    modifiers=""
+    modifiersIndex = 5 if zoneType == ZoneType.TRIGGER else 4
+    if len(l)>modifiersIndex:
+        modifiers=l[modifiersIndex]
+
+    return ZoneSpec(zoneType,color,centre,name,triggerType,action,action2,warmup,repeatTime,modifiers)
+
+def parse_time(text:str):
+    """The number of seconds in a timing phrase, 0 if it is not a number"""
+    try:
+        return float(text)
+    except ValueError:
+        return 0
+
+def iter_zone_specs(lines:Iterable[str], source:str="") -> Iterator[ZoneSpec]:
+    """Yields the zone specs of a zone file one block at a time, see iter_lines for the lines.
+
+    Blocks start at a line beginning with '#' and end at a blank line. Blocks that fail to parse are
+    reported with their source and line number and skipped.
+    """
+    block = []
+    first_line_number = 0
+    for line_number, text in enumerate(lines, 1):
+        first = text[:1]
+        if first=='#':
+            block = [text]
+            first_line_number = line_number
+        elif first and (first not in WHITESPACE or not text.isspace()):
+            if not block:
+                first_line_number = line_number
+            block.append(text)
+        elif block:
+            spec = _parse_block(block, first_line_number, source)
+            block = []
+            if spec is not None:
+                yield spec
+    if block:
+        spec = _parse_block(block, first_line_number, source)
+        if spec is not None:
+            yield spec
+
+def _parse_block(block:list[str], first_line_number:int, source:str) -> ZoneSpec:
+    try:
+        spec = parse_zone_lines(block, first_line_number)
+    except ZoneParseError as ex:
+        print("Failed to parse zone in %s at %s\n%s"%(source, ex, "\n".join(block)))
+        return None
+    report_action_problems(spec, first_line_number, source)
+    return spec
+
+def report_action_problems(spec:ZoneSpec, first_line_number:int, source:str=""):
+    """Compiles the actions of the zone ahead of time and reports the ones that will not do what they appear to"""
+    problem = getattr(compile_action(spec.action), "problem", None)
+    if problem is not None:
+        print("Zone action in %s at line %d: %s"%(source, first_line_number + 3, problem))
+    if spec.action2 is not None:
+        problem = getattr(compile_action(spec.action2), "problem", None)
+        if problem is not None:
+            print("Zone action in %s at line %d: %s"%(source, first_line_number + 4, problem))
+
+def iter_lines(f, chunk_size:int=READ_CHUNK_SIZE) -> Iterator[str]:
+    """Yields the lines of the file without their newline, reading it a chunk at a time"""
+    rest = ""
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        lines = (rest + data).split("\n")
+        rest = lines.pop()
+        yield from lines
+    if rest:
+        yield rest
+
+def parse_zone_file(path:str) -> list[ZoneSpec]:
+    """Parses every zone block in the file, raises FileNotFoundError if it does not exist"""
+    with open(path,"r") as f:
+        return list(iter_zone_specs(iter_lines(f), path))
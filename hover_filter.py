@@ -0,0 +1,38 @@
+from .helpers import TRANSPARENT
+
+class HoverFilter:
+    def __init__(self, margin: float):
+        """Hysteresis for the hovered zone, so pointer jitter across the edge of a zone does not restart its warmup.
+
+        A hovered zone stays hovered until the pointer leaves its rectangle grown by margin pixels on every side,
+        even if the pointer is over the gap next to it or a neighbouring zone in the meantime.
+
+        Args:
+            margin: How far in pixels the pointer has to leave a zone before it stops being hovered
+        """
+        self.margin = margin
+        self.zoneId = TRANSPARENT
+        self.left = 0
+        self.top = 0
+        self.right = 0
+        self.bottom = 0
+
+    def reset(self):
+        self.zoneId = TRANSPARENT
+
+    def filter(self, zone_id, x, y, zones: dict):
+        """Returns the zone that counts as hovered given the zone under the pointer at x, y"""
+        if zone_id == self.zoneId:
+            return zone_id
+        if self.zoneId != TRANSPARENT and self.zoneId in zones:
+            if self.left <= x < self.right and self.top <= y < self.bottom:
+                return self.zoneId
+        self.zoneId = zone_id
+        zone = zones.get(zone_id)
+        if zone is not None:
+            margin = self.margin
+            self.left = zone.left - margin
+            self.top = zone.top - margin
+            self.right = zone.left + zone.width + margin
+            self.bottom = zone.top + zone.height + margin
+        return zone_id
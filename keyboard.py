@@ -1,5 +1,11 @@
+import os
+from collections import OrderedDict
 from talon import actions
 
+DEFAULT_LAYOUT_NAME = "qwerty"
+MODIFIER_PREFIX = "mod:"
+SECONDARY_KEY_SEPARATOR = "|"
+
 class Key:
 	def __init__(self, main_key: str, secondary_key: str | None = None, is_modifier: bool = False):
 		"""Represents a key on the virtual keyboard.
@@ -24,22 +30,84 @@ class Key:
 def create_letter_key(character: str):
 	return Key(character.lower(), character.upper())
 
+def create_qwerty_rows() -> list[list[Key]]:
+	return [
+		[Key("esc"), Key("f1"), Key("f2"), Key("f3"), Key("f4"), Key("f5"), Key("f6"), Key("f7"), Key("f8"), Key("f9"), Key("f10"), Key("f11"), Key("f12")],
+		[Key("`", "~"), Key("1", "!"), Key("2", "@"), Key("3", "#"), Key("4", "$"), Key("5", "%"), Key("6", "^"),
+		Key("7", "&"), Key("8", "*"), Key("9", "("), Key("0", ")"), Key("-", "_"), Key("+", "="), Key("backspace")
+		],
+		[Key("tab")] + [create_letter_key(c) for c in "qwertyuiop"] + [Key("[", "{"), Key("]", "}"), Key("\\", "|")],
+		[create_letter_key(c) for c in "asdfghjkl"] + [Key(";", ":"), Key("'", '"'), Key("enter")],
+		[Key("shift", is_modifier=True)] + [create_letter_key(c) for c in "zxcvbnm"] + [Key(",", "<"), Key(".", ">"), Key("/", "?"), Key("rshift", is_modifier=True)],
+		[Key("ctrl", is_modifier=True), Key("alt", is_modifier=True), Key("super", is_modifier=True), Key("space"), Key("rctrl", is_modifier=True), Key("ralt", is_modifier=False), Key("left"), Key("down"), Key("up"), Key("right")]
+	]
+
+def parse_key(token: str) -> Key:
+	"""Parses a key token of a keyboard layout file.
+
+	Tokens look like main|secondary, where the secondary key is optional and pressed with shift held.
+	Tokens starting with mod: are modifiers and single letters get their upper case letter as secondary key.
+
+	Args:
+		token: The key token, for example a, 1|!, enter or mod:shift
+	"""
+	if token.startswith(MODIFIER_PREFIX) and len(token) > len(MODIFIER_PREFIX):
+		return Key(token[len(MODIFIER_PREFIX):], is_modifier=True)
+	# the separator is a key itself when it comes first
+	separator = token.find(SECONDARY_KEY_SEPARATOR, 1)
+	if separator > 0:
+		return Key(token[:separator], token[separator + 1:] or None)
+	if len(token) == 1 and token.isalpha():
+		return create_letter_key(token)
+	return Key(token)
+
+def parse_keyboard_layout(text: str) -> list[list[Key]]:
+	"""Parses a keyboard layout file, every line that is not blank holds a row of whitespace separated key tokens"""
+	return [[parse_key(token) for token in line.split()] for line in text.splitlines() if line.strip()]
+
+class KeyboardLayouts:
+	def __init__(self, directory: str, capacity: int = 8):
+		"""The keyboard layouts in a directory, layout files are named after the layout and parsed again only when they change.
+
+		Args:
+			directory: The directory holding the layout files
+			capacity: The number of parsed layout files kept
+		"""
+		self.directory = directory
+		self.capacity = capacity
+		self.entries = OrderedDict()
+		self.defaultRows = create_qwerty_rows()
+
+	def get(self, name: str):
+		"""Returns the rows of the layout and a signature that changes whenever the layout does.
+
+		The built in qwerty layout is used unless a file overrides it. Raises FileNotFoundError if there is no such layout.
+		"""
+		path = os.path.join(self.directory, name + ".txt")
+		try:
+			stat = os.stat(path)
+		except FileNotFoundError:
+			if name != DEFAULT_LAYOUT_NAME:
+				raise
+			return self.defaultRows, None
+		signature = (stat.st_mtime_ns, stat.st_size)
+		entry = self.entries.get(path)
+		if entry is None or entry[1] != signature:
+			with open(path, "r", encoding="utf-8") as f:
+				entry = (parse_keyboard_layout(f.read()), signature)
+			self.entries[path] = entry
+			while len(self.entries) > self.capacity:
+				self.entries.popitem(last=False)
+		self.entries.move_to_end(path)
+		return entry
+
 class Keyboard:
 	def __init__(self):
 		"""Represents a virtual keyboard where keys can be pressed through eye tracking.
 			This provides the information needed to create the interaction zones but does not
 			handle eye tracking input itself."""
 		self._held_modifiers = set()
-		self.rows = [
-			[Key("esc"), Key("f1"), Key("f2"), Key("f3"), Key("f4"), Key("f5"), Key("f6"), Key("f7"), Key("f8"), Key("f9"), Key("f10"), Key("f11"), Key("f12")],
-			[Key("`", "~"), Key("1", "!"), Key("2", "@"), Key("3", "#"), Key("4", "$"), Key("5", "%"), Key("6", "^"),
-			Key("7", "&"), Key("8", "*"), Key("9", "("), Key("0", ")"), Key("-", "_"), Key("+", "="), Key("backspace")
-			],
-			[Key("tab")] + [create_letter_key(c) for c in "qwertyuiop"] + [Key("[", "{"), Key("]", "}"), Key("\\", "|")],
-			[create_letter_key(c) for c in "asdfghjkl"] + [Key(";", ":"), Key("'", '"'), Key("enter")],
-			[Key("shift", is_modifier=True)] + [create_letter_key(c) for c in "zxcvbnm"] + [Key(",", "<"), Key(".", ">"), Key("/", "?"), Key("rshift", is_modifier=True)],
-			[Key("ctrl", is_modifier=True), Key("alt", is_modifier=True), Key("super", is_modifier=True), Key("space"), Key("rctrl", is_modifier=True), Key("ralt", is_modifier=False), Key("left"), Key("down"), Key("up"), Key("right")]
-		]
+		self.rows = create_qwerty_rows()
 		self.x: int = 20
 		self.y: int = 20
 		self._height: int = 0
@@ -55,7 +123,7 @@ class Keyboard:
 				self._held_modifiers.add(key.main_key)
 		else:
 			try:
-				if "shift" in self._held_modifiers:
+				if "shift" in self._held_modifiers and key.secondary_key:
 					keys = [modifier for modifier in self._held_modifiers if modifier != "shift"] + [key.secondary_key]
 				else:
 					keys = list(self._held_modifiers) + [key.main_key]
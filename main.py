@@ -1,6 +1,6 @@
 import os
 from talon import Module, app
-from .master import toggle_showing
+from .master import toggle_showing, toggle_metrics, print_metrics, save_metrics, start_recording, stop_recording
 
 def set_up():
     from .master import setup
@@ -17,3 +17,38 @@ class Actions:
             toggle_showing()
         except Exception as e:
             print(str(e))
+
+    def interaction_zones_toggle_metrics():
+        """Toggle measuring how long the interaction zones take"""
+        try:
+            toggle_metrics()
+        except Exception as e:
+            print(str(e))
+
+    def interaction_zones_print_metrics():
+        """Print a summary of the interaction zones metrics to the talon log"""
+        try:
+            print_metrics()
+        except Exception as e:
+            print(str(e))
+
+    def interaction_zones_save_metrics():
+        """Save the interaction zones metrics as JSON in the InteractionZones directory"""
+        try:
+            save_metrics()
+        except Exception as e:
+            print(str(e))
+
+    def interaction_zones_start_recording():
+        """Start recording the pointer and window titles to a trace in the InteractionZones traces directory"""
+        try:
+            start_recording()
+        except Exception as e:
+            print(str(e))
+
+    def interaction_zones_stop_recording():
+        """Stop recording the interaction zones trace"""
+        try:
+            stop_recording()
+        except Exception as e:
+            print(str(e))
@@ -1,25 +1,46 @@
-from talon import ui, canvas, cron, ctrl, actions
+from talon import ui, cron, ctrl
 from talon.skia import Rect, Image
 import os
-import math
+import time
 from typing import Union, Callable
-from .helpers import rgba2hex, verify_home_dir, TRANSPARENT, TriggerType
-from .config_parser import parse_zone,is_line_newzone,is_line_endzone
+from .helpers import rgba2hex, verify_home_dir, TRANSPARENT
+from .zone_cache import ZoneSetCache
+from .zone_set_builder import ZoneSet, ZoneSetBuilder, build_file_zone_set
+from .zone_set_pool import ZoneSetPool
+from .zone_layers import Overlay
+from .config_parser import create_zone
+from .zone_directory import ZoneSetDirectory
 from .settings import *
-from .zones import SimpleZone
-from .keyboard import Keyboard, Key
+from .spatial_index import ZoneIndex
+from .scheduler import TickScheduler
+from .timers import TimerQueue, now as current_time
+from .renderer import measure_text
+from .screen_surfaces import ScreenSurface, compute_rect_key
+from .hover_filter import HoverFilter
+from .metrics import metrics
+from .pointer_trace import TraceRecorder
+from .keyboard import Keyboard
+from .zone_actions import compile_action
+from .action_executor import ActionExecutor
+from .special_zones import ListPager, KeyboardProvider, SnippetProvider, RecentInsertsProvider, RecentKeystrokesProvider, OperatorProvider
 
 HOME_DIRECTORY = verify_home_dir()
+KEYBOARD_LAYOUT_DIRECTORY = os.path.join(HOME_DIRECTORY, "keyboards")
 ZONE_SIZE = 200
+# Window changes arrive through talon events, polling only catches events that were missed
+WINDOW_FALLBACK_POLL_INTERVAL = '1000ms'
+TOGGLE_SHOWING_COLOR = rgba2hex(64,128,64,ZONE_TOGGLE_SWITCH_ALPHA)
+TOGGLE_HIDDEN_COLOR = rgba2hex(128,128,128,ZONE_TOGGLE_SWITCH_ALPHA)
+WINDOW_NAME_COLOR = rgba2hex(255,255,255,200)
 
-SNIPPET_ACTION_PREFIX = "snippet: "
-OPERATOR_ACTION_PREFIX = "operator: "
 SPECIAL_SWAP_NAME_PREFIX = ":"
 SNIPPET_ZONE_NAME = "SNIPPET"
 OPERATOR_ZONE_NAME = "OPERATOR"
 RECENT_INSERTS_ZONE_NAME = "RECENT_INSERT"
 RECENT_KEYSTROKES_ZONE_NAME = "RECENT_KEYSTROKE"
 KEYBOARD_ZONE_NAME = "KEYBOARD"
+# the hit-test index of surfaces without zones
+EMPTY_INDEX = ZoneIndex()
 SPECIAL_ZONE_NAMES = set([SNIPPET_ZONE_NAME, OPERATOR_ZONE_NAME, RECENT_INSERTS_ZONE_NAME, RECENT_KEYSTROKES_ZONE_NAME, KEYBOARD_ZONE_NAME])
 
 class Master:
@@ -27,286 +48,468 @@ class Master:
         self.displays = {}
         self.showZones = False
         
-        # I am not sure about multiple screens here, but it could be theoretically supported
-        screens = ui.screens()
-        self.screen = screens[0]
-        self.screenRect = self.screen.rect.copy()
+        # every screen gets its own canvases and hit-test index, the first one also shows the toggle and special zone sets
+        self.surfaces = [self.create_surface(screen) for screen in ui.screens()]
+        self.primarySurface = self.surfaces[0]
+        self.screen = self.primarySurface.screen
+        self.screenRect = self.primarySurface.rect
         self.zonesRect = self.screenRect
-        self.canvas = canvas.Canvas.from_screen(self.screen)
+        # the surface the pointer was last on, checked first when looking up the surface under the pointer
+        self.cursorSurface = self.primarySurface
+        self.blockingSurface = None
+        self.enabled = False
         
         self.zones = dict()
+        # the zone ids and hit-test index for each surface
+        self.partition = None
+        self.listPager = None
+        self.timers = TimerQueue()
+        self.executor = ActionExecutor(primative_interaction)
+        self.zone_set_cache = ZoneSetCache(ZONE_SET_CACHE_SIZE)
+        self.zone_set_directory = ZoneSetDirectory(HOME_DIRECTORY)
+        # the cached zone set the shown file zones were created from, kept to apply edits of the file
+        self.zoneFile = None
+        self.zoneFilePath = None
+        self.zoneSetBuilder = ZoneSetBuilder(BACKGROUND_ZONE_SET_BUILD)
+        # the shown zone set, parked in the pool when another one replaces it
+        self.zoneSet = None
+        # zone sets shown on top of it, hit-tested before it from the top down
+        self.overlays = []
+        self.zoneSetPool = ZoneSetPool(PARKED_ZONE_SET_COUNT, PARKED_ZONE_SET_KEEPS_TRIGGERS, PARKED_ZONE_SET_KEEPS_TIMERS)
         self.configs = dict()
         self.activeID=TRANSPARENT
+        self.zoneUpdateCount = 0
+        self.recorder = None
+        self.hoverFilter = HoverFilter(HOVER_EXIT_MARGIN)
         
-        w=60 if not ZONE_TOGGLE_OVERRIDE_SIZE else ZONE_TOGGLE_OVERRIDE_WIDTH
-        h=30 if not ZONE_TOGGLE_OVERRIDE_SIZE else ZONE_TOGGLE_OVERRIDE_HEIGHT
-        if ZONE_TOGGLE_OVERRIDE_POSITION:
-            self.toggleRect=(Rect(ZONE_TOGGLE_OVERRIDE_X,ZONE_TOGGLE_OVERRIDE_Y,w,h))
-        else:
-            self.toggleRect=(Rect(self.screen.width/2 - w/2,10,w,h))
+        self.toggleRect = self.compute_toggle_rect()
         
         self.lastWindowTitle = ""
         self.activeZoneSet = ""
         self.overrideZoneSet=None
         self.updateTriggered=False
+        self.reevaluateJob = None
+        self.lastMousePosition = None
+        self.redrawPending = False
+        self.scheduler = TickScheduler(self.update, ACTIVE_UPDATE_INTERVAL_MS, IDLE_UPDATE_INTERVAL_MS, IDLE_UPDATE_DELAY)
+        self.specialZoneProviders = {
+            SNIPPET_ZONE_NAME: SnippetProvider(self),
+            RECENT_INSERTS_ZONE_NAME: RecentInsertsProvider(self),
+            RECENT_KEYSTROKES_ZONE_NAME: RecentKeystrokesProvider(self),
+            OPERATOR_ZONE_NAME: OperatorProvider(self),
+        }
         self.keyboard: Keyboard = Keyboard()
         self.keyboard.update_size(self.screen.width, self.screen.height//2)
+        self.keyboardProvider = KeyboardProvider(self.keyboard, KEYBOARD_LAYOUT_DIRECTORY)
+
+    def compute_toggle_rect(self):
+        w=60 if not ZONE_TOGGLE_OVERRIDE_SIZE else ZONE_TOGGLE_OVERRIDE_WIDTH
+        h=30 if not ZONE_TOGGLE_OVERRIDE_SIZE else ZONE_TOGGLE_OVERRIDE_HEIGHT
+        if ZONE_TOGGLE_OVERRIDE_POSITION:
+            return Rect(ZONE_TOGGLE_OVERRIDE_X,ZONE_TOGGLE_OVERRIDE_Y,w,h)
+        return Rect(self.screen.x + self.screen.width/2 - w/2,self.screen.y + 10,w,h)
+
+    def create_surface(self, screen) -> ScreenSurface:
+        return ScreenSurface(screen, self.draw_zones, self.draw, self.on_mouse)
 
     def set_zone_override(self,zoneSet):
+        if self.recorder is not None:
+            self.recorder.override(current_time(), zoneSet)
         self.overrideZoneSet=zoneSet
         self.updateTriggered = True
+        self.schedule_zone_set_reevaluation()
+
+    def schedule_zone_set_reevaluation(self):
+        # overrides are usually set by zone actions in the middle of an update, so the zones are swapped afterwards
+        if self.reevaluateJob is None:
+            self.reevaluateJob = cron.after('0ms', self.reevaluate_zone_set)
 
     def enable(self,showZones) -> None:  
-        self.canvas.register("draw", self.draw)        
-        self.job = cron.interval('16ms', self.update)        
-        self.job2 = cron.interval('100ms', self.slow_update)        
-        self.canvas.register("mouse", self.on_mouse)
+        self.enabled = True
+        for surface in self.surfaces:
+            surface.enable()
+        if TOGGLE_ZONE_ENABLED:
+            self.scheduler.wake()
+        self.job2 = cron.interval(WINDOW_FALLBACK_POLL_INTERVAL, self.slow_update)        
+        ui.register("win_focus", self.on_window_change)
+        ui.register("win_title", self.on_window_change)
+        ui.register("screen_change", self.on_screen_change)
+        self.lastWindowTitle = self.poll_active_window_title()
         if showZones:
             self.show()      
             
     def show(self):
+        """Shows the zone set for the override or active window, zone files are built while the shown zones keep working"""
+        self.updateTriggered = False
+        if not is_special_zone(self.overrideZoneSet):
+            self.request_file_zone_set()
+            return
+        self.zoneSetBuilder.cancel()
+        if self.showZones and self.zoneSet is not None and self.zoneSet.zoneFile is not None:
+            # special zone sets open over the shown zone file, which stays as it is underneath
+            self.pop_overlays()
+            zone_set = self.build_special_zone_set()
+            if zone_set is not None:
+                self.push_overlay(zone_set)
+            self.redraw()
+            return
+        self.publish_zone_set(self.build_special_zone_set())
+
+    def publish_zone_set(self, zone_set: ZoneSet):
+        """Replaces the shown zones with the zone set in one go on the talon thread, None shows nothing"""
+        start = time.perf_counter() if metrics.enabled else 0.0
+        self.pop_overlays()
+        self.retire_zone_set()
         self.showZones = False
-        self.activeZoneSet=""
-        self.zones = dict()
-        if is_special_zone(self.overrideZoneSet):
-            self.show_special_zone_set()
+        self.timers.clear()
+        self.activeID = TRANSPARENT
+        self.hoverFilter.reset()
+        self.zoneSet = zone_set
+        if zone_set is None:
+            self.activeZoneSet = ""
+            self.zones = dict()
+            self.listPager = None
+            self.partition = None
+            self.zoneFile = None
         else:
-            self.show_file()
+            self.activeZoneSet = zone_set.name
+            # overlays add their zones to the shown zones, the zone set keeps only its own
+            self.zones = dict(zone_set.zones)
+            self.listPager = zone_set.listPager
+            self.zoneFile = zone_set.zoneFile
+            self.zoneFilePath = zone_set.zoneFilePath
+            self.partition = zone_set.partition
+            if self.zoneFile is not None:
+                self.zone_set_cache.store(self.zoneFilePath, self.zoneFile)
+                self.partition = self.zoneFile.get_partition([surface.rect for surface in self.surfaces])
+                print("Passed config parsing stage with %s"%self.activeZoneSet)
+            self.showZones = True
+        self.schedule_all_zones()
+        self.place_zones()
+        self.scheduler.wake()
+        self.redraw()
+        if metrics.enabled:
+            metrics.record_time("show", time.perf_counter() - start)
+            metrics.record_value("zones shown", len(self.zones))
 
-    def show_special_zone_set(self):
+    def push_overlay(self, zone_set: ZoneSet):
+        """Shows the zone set on top of the shown zones, the layers below keep their zones, state and index"""
+        overlay = Overlay(zone_set, len(self.overlays) + 1)
+        self.suspend_timers(overlay)
+        self.overlays.append(overlay)
+        self.place_overlay(overlay)
+        self.activeZoneSet = zone_set.name
+        self.listPager = zone_set.listPager
+        self.scheduler.wake()
+
+    def pop_overlay(self):
+        """Removes the top overlay, the layers below it are left as they are"""
+        overlay = self.overlays.pop()
+        self.remove_overlay(overlay)
+        now = current_time()
+        for zone_id in overlay.suspendedIds:
+            zone = self.zones.get(zone_id)
+            if zone is not None:
+                self.timers.schedule(zone_id, zone.next_deadline(now))
+        top = self.overlays[-1].zoneSet if self.overlays else self.zoneSet
+        self.activeZoneSet = top.name if top is not None else ""
+        self.listPager = top.listPager if top is not None else None
+
+    def pop_overlays(self):
+        while self.overlays:
+            self.pop_overlay()
+
+    def suspend_timers(self, overlay: Overlay):
+        """Stops the timers of the zones below the overlay until it is popped, the pointer counts as having left them"""
+        previousID = self.activeID
+        self.activeID = TRANSPARENT
+        if previousID in self.zones:
+            self.update_zone(previousID, current_time())
+        overlay.suspendedIds = list(self.timers.deadlines)
+        self.timers.clear()
+
+    def place_overlay(self, overlay: Overlay):
+        self.zones.update(overlay.zones)
+        self.push_overlay_layers(overlay)
+        self.hoverFilter.reset()
+        now = current_time()
+        for zone_id, zone in overlay.zones.items():
+            self.timers.schedule(zone_id, zone.next_deadline(now))
+
+    def push_overlay_layers(self, overlay: Overlay):
+        zone_ids, index = overlay.get_index()
+        for surface in self.surfaces:
+            # special zone sets are only shown on the primary screen, the other screens get an empty layer
+            if surface is self.primarySurface:
+                surface.push_layer(overlay.zones, list(overlay.zones), index, overlay.globalIds)
+            else:
+                surface.push_layer(dict(), (), EMPTY_INDEX)
+
+    def remove_overlay(self, overlay: Overlay):
+        zones = self.zones
+        for zone_id, zone in overlay.zones.items():
+            zone.deactivate()
+            self.timers.unschedule(zone_id)
+            del zones[zone_id]
+        if self.activeID in overlay.zones:
+            self.activeID = TRANSPARENT
+        for surface in self.surfaces:
+            surface.pop_layer()
+        self.hoverFilter.reset()
+
+    def retire_zone_set(self):
+        """Parks the shown zone file so swapping back to it is immediate, other zone sets are deactivated"""
+        zone_set = self.zoneSet
+        if not self.showZones or zone_set is None or zone_set.zoneFile is None:
+            self.deactivate_zones()
+            return
+        self.zoneSetPool.park(self.compute_pool_key(zone_set.zoneFilePath), zone_set, current_time())
+        self.release_mouse()
+
+    def compute_pool_key(self, path: str) -> tuple:
+        return (path, tuple(surface.key for surface in self.surfaces))
+
+    def build_special_zone_set(self) -> ZoneSet:
+        # special zone sets read talon state, so they are built on the talon thread
         name = compute_special_zone_name(self.overrideZoneSet)
-        if name in SPECIAL_ZONE_NAMES:
-            self.activeZoneSet = name
-        if name == SNIPPET_ZONE_NAME:
-            snippet_names = actions.user.get_snippet_names()
-            self.color_map = {}
-            relevant_snippet_names = []
-            for snippet_name in snippet_names:
-                # make an appropriate zone?
-                try:
-                    snippet = actions.user.get_snippet(snippet_name)
-                    if snippet:
-                        relevant_snippet_names.append(snippet_name)
-                except Exception:
-                    pass
-            relevant_snippet_names = sorted(relevant_snippet_names)
-            insert_actions = ["snippet: " + name for name in relevant_snippet_names]
-            self.show_zone_for_list(relevant_snippet_names, insert_actions)
-        elif name == RECENT_INSERTS_ZONE_NAME:
-            recent_inserts = actions.user.fire_chicken_interaction_zones_get_recent_inserts()
-            def insert_text(text):
-                self.set_zone_override(DEFAULT_FILE_NAME)
-                actions.insert(text)
-            def create_operator(text):
-                return lambda: insert_text(text)
-            insert_actions = [create_operator(text) for text in recent_inserts]
-            self.show_zone_for_list(recent_inserts, insert_actions)
-        elif name == RECENT_KEYSTROKES_ZONE_NAME:
-            recent_keystrokes = actions.user.fire_chicken_interaction_zones_get_recent_keystrokes()
-            def press_keystroke(keystroke):
-                self.set_zone_override(DEFAULT_FILE_NAME)
-                actions.key(keystroke)
-            def create_operator(keystroke):
-                return lambda: press_keystroke(keystroke)
-            key_stroke_actions = [create_operator(keystroke) for keystroke in recent_keystrokes]
-            self.show_zone_for_list(recent_keystrokes, key_stroke_actions)
-        elif name == OPERATOR_ZONE_NAME:
-            operator_names = ["SUBSCRIPT",
-            "ASSIGNMENT",
-            "ASSIGNMENT_OR",
-            "ASSIGNMENT_SUBTRACTION",
-            "ASSIGNMENT_ADDITION",
-            "ASSIGNMENT_MULTIPLICATION",
-            "ASSIGNMENT_DIVISION",
-            "ASSIGNMENT_MODULO",
-            "ASSIGNMENT_INCREMENT",
-            "ASSIGNMENT_BITWISE_AND",
-            "ASSIGNMENT_BITWISE_OR",
-            "ASSIGNMENT_BITWISE_EXCLUSIVE_OR",
-            "ASSIGNMENT_BITWISE_LEFT_SHIFT",
-            "ASSIGNMENT_BITWISE_RIGHT_SHIFT",
-            "BITWISE_AND",
-            "BITWISE_OR",
-            "BITWISE_NOT",
-            "BITWISE_EXCLUSIVE_OR",
-            "BITWISE_LEFT_SHIFT",
-            "BITWISE_RIGHT_SHIFT",
-            "LAMBDA",
-            "MATH_SUBTRACT",
-            "MATH_ADD",
-            "MATH_MULTIPLY",
-            "MATH_DIVIDE",
-            "MATH_INTEGER_DIVIDE",
-            "MATH_MODULO",
-            "MATH_EXPONENT",
-            "MATH_EQUAL",
-            "MATH_NOT_EQUAL",
-            "MATH_WEAK_EQUAL",
-            "MATH_WEAK_NOT_EQUAL",
-            "MATH_WEAK_AND",
-            "MATH_WEAK_OR",
-            "MATH_WEAK_NOT",
-            "MATH_GREATER_THAN",
-            "MATH_GREATER_THAN_OR_EQUAL",
-            "MATH_LESS_THAN",
-            "MATH_LESS_THAN_OR_EQUAL",
-            "MATH_AND",
-            "MATH_OR",
-            "MATH_NOT",
-            "MATH_IN",
-            "MATH_NOT_IN",
-            "POINTER_INDIRECTION",
-            "POINTER_ADDRESS_OF",
-            "POINTER_STRUCTURE_DEREFERENCE",]
-            def insert_operator(operator_name):
-                try:
-                    actions.user.code_operator(operator_name)
-                except Exception as ex:
-                    print('operator_name', operator_name)
-                self.set_zone_override(DEFAULT_FILE_NAME)
-            def create_lambda(operator_name):
-                return lambda: insert_operator(operator_name)
-            corresponding_actions = [create_lambda(operator_name) for operator_name in operator_names]
-            self.show_zone_for_list(operator_names, corresponding_actions)
-        elif name == KEYBOARD_ZONE_NAME:
-            def create_key_operator(key: Key):
-                return lambda: self.keyboard.handle_keypress(key)
-                
-            self.color_map = {}
-            x = self.keyboard.x
-            y = self.keyboard.y
-            key_height = self.keyboard.compute_key_height()
-            adjusted_height = round(key_height * 0.65)
-            for row_index in range(len(self.keyboard.rows)):
-                key_width = self.keyboard.compute_row_key_width(row_index)
-                adjusted_width = round(key_width * 0.65)
-                for key in self.keyboard.rows[row_index]:
-                    key_text = f"{key.main_key} / {key.secondary_key}" if key.secondary_key else key.main_key
-                    center_x = x + key_width // 2
-                    center_y = y + key_height // 2
-                    zone = SimpleZone(color="#7aacddff", name=key_text, ttype=TriggerType.HOVER, action=create_key_operator(key), warmup=1, repeatTime=1, modifiers="", centre=(center_x, center_y), dimensions=(adjusted_height, adjusted_width))
-                    
-                    self.add_zone(zone)
-                    x += key_width
-                y += key_height
-                x = self.keyboard.x
-            center_x = x + key_width // 2
-            center_y = y + key_height // 2
-            return_to_default_zone = SimpleZone(color="#7aacddff", name="swap default", ttype=TriggerType.HOVER, action="swap: default", warmup=1, repeatTime=1, modifiers="", centre=(center_x, center_y), dimensions=(key_height, key_width))
-            self.add_zone(return_to_default_zone)
-            self.showZones = True
+        provider = self.specialZoneProviders.get(name)
+        if provider is not None:
+            layout = provider.get_layout(self.zonesRect)
+            list_pager = ListPager(layout, self.flip_list_page)
+            return ZoneSet(name, list_pager.zones, self.partition_on_primary(list_pager.zones, layout.index), list_pager=list_pager)
+        if name == KEYBOARD_ZONE_NAME:
+            layout_name = compute_special_zone_argument(self.overrideZoneSet)
+            try:
+                keyboard_zone_set = self.keyboardProvider.get_zone_set(layout_name)
+            except FileNotFoundError:
+                print("Keyboard layout '%s' not found in %s."%(layout_name, KEYBOARD_LAYOUT_DIRECTORY))
+                return None
+            return ZoneSet(name, keyboard_zone_set.zones, self.partition_on_primary(keyboard_zone_set.zones, keyboard_zone_set.index))
+        return None
 
-    def show_zone_for_list(self, names, corresponding_actions):
-        if len(names) != len(corresponding_actions):
-            print("The number of names in the list did not match the number of actions!")
-            return 
-        zone_number = 0
-        left = self.zonesRect.left
-        top = self.zonesRect.top
-        height = self.zonesRect.height
-        width = self.zonesRect.width
-        number_of_actions = len(names) + 1 # add one for the return action
-        number_per_row_and_column = math.ceil(math.sqrt(number_of_actions))
-        zone_width = math.floor(width/number_per_row_and_column)
-        zone_height = math.floor(height/number_per_row_and_column)
-        zone_dimensions = (math.floor(0.65*zone_height), math.floor(0.65*zone_width))
-        def compute_dimensions(id):
-            x = left + ((id % number_per_row_and_column) + 1)*zone_width - 0.5*zone_width
-            y = top + ((id//number_per_row_and_column) + 1)*zone_height - 0.5*zone_height
-            return x, y
-        
-        for n, action in zip(names, corresponding_actions):
-            x, y = compute_dimensions(zone_number)
-            zone = SimpleZone(color="#7aacddff", name=n, ttype=TriggerType.HOVER, action=action, warmup=1, repeatTime=1, modifiers="", centre=(x, y), dimensions=zone_dimensions)
-            self.add_zone(zone)
-            zone_number += 1
-        x, y = compute_dimensions(zone_number)
-        return_to_default_zone = SimpleZone(color="#7aacddff", name="swap default", ttype=TriggerType.HOVER, action="swap: default", warmup=1, repeatTime=1, modifiers="", centre=(x, y), dimensions=zone_dimensions)
-        self.add_zone(return_to_default_zone)
-        self.showZones = True
-
-    def show_file(self):
+    def flip_list_page(self, direction):
+        if self.listPager is None or not self.showZones:
+            return
+        pager = self.listPager
+        if self.overlays and self.overlays[-1].zoneSet.listPager is pager:
+            # only the overlay holding the list changes
+            overlay = self.overlays[-1]
+            self.remove_overlay(overlay)
+            pager.show_page(pager.page + direction)
+            overlay.zoneSet.zones = pager.zones
+            overlay.refresh()
+            self.place_overlay(overlay)
+            self.redraw()
+            return
+        self.deactivate_zones()
+        pager.show_page(pager.page + direction)
+        # the zones were reassigned, so the hovered one is hovered afresh on the next update
+        self.activeID = TRANSPARENT
+        self.hoverFilter.reset()
+        self.zoneSet.zones = pager.zones
+        self.zones = dict(pager.zones)
+        self.partition = self.partition_on_primary(self.zones, pager.layout.index)
+        self.timers.clear()
+        self.schedule_all_zones()
+        self.place_zones()
+        self.redraw()
+
+    def request_file_zone_set(self):
         optimal_name = self.get_optimal_file_name()
         s=os.path.join(HOME_DIRECTORY, optimal_name)
-        self.color_map = {}
+        path = "%s.txt" % (s)
         try:
-            with open("%s.txt" % (s),"r") as f:
-                lines = f.readlines()
-                lines.append(" ")
-                ss = ""
-                for s in lines:
-                    if is_line_newzone(s):
-                        ss = s
-                    elif not is_line_endzone(s):
-                        ss+=s
-                    else:
-                        z=parse_zone(ss)
-                        if z != None:
-                            self.add_zone(z)
-                        else:
-                            print("Failed to parse zone with config\n%s"%ss)
-            
-            self.activeZoneSet = optimal_name
-            
-            print("Passed config parsing stage with %s"%self.activeZoneSet)
-            self.showZones = True
+            cached_zone_set = self.zone_set_cache.get(path)
         except FileNotFoundError:
             print("Either configuration file txt or image png not found (%s)."%s)
+            self.zoneSetBuilder.cancel()
+            self.publish_zone_set(None)
+            return
+        key = self.compute_pool_key(path)
+        shown = self.zoneSet
+        if self.showZones and shown is not None and shown.zoneFile is not None and self.compute_pool_key(shown.zoneFilePath) == key and shown.is_current():
+            # the zone file is already shown, so its zones keep their state and only the overlays close
+            self.zoneSetBuilder.cancel()
+            if self.overlays:
+                self.pop_overlays()
+                self.scheduler.wake()
+                self.redraw()
+            return
+        parked = self.zoneSetPool.take(key)
+        if parked is not None:
+            self.zoneSetBuilder.cancel()
+            self.publish_zone_set(parked)
             return
+        # the cached zone set may be reloaded while the zones are created, so they are created from a snapshot
+        items = list(cached_zone_set.items()) if cached_zone_set is not None else None
+        key = (path, None if cached_zone_set is None else cached_zone_set.signature)
+        self.zoneSetBuilder.submit(key, lambda: build_file_zone_set(optimal_name, path, cached_zone_set, items), self.publish_zone_set)
+
+    def reload_zone_file(self):
+        """Applies edits of the shown zone file, only the added, edited and removed zones are replaced"""
+        if not self.showZones or self.zoneFile is None or self.zoneSetBuilder.is_pending():
+            return
+        start = time.perf_counter() if metrics.enabled else 0.0
+        try:
+            change = self.zone_set_cache.reload(self.zoneFilePath, self.zoneFile)
+        except FileNotFoundError:
+            # the directory listing notices the file is gone and the zone set is swapped on the next reevaluation
+            return
+        if change is None:
+            return
+        print("Reloaded %s, %d zones added, %d changed and %d removed"%(self.activeZoneSet, len(change.added), len(change.changed), len(change.removed)))
+        zones = self.zones
+        for zone_id in change.changed + change.removed:
+            self.timers.unschedule(zone_id)
+            # held triggers of replaced zones are released like when the zones are hidden
+            zone = zones.get(zone_id)
+            if zone is not None:
+                zone.deactivate()
+            if zone_id == self.activeID:
+                self.activeID = TRANSPARENT
+                self.hoverFilter.reset()
+        replaced = set(change.added)
+        replaced.update(change.changed)
+        base_zones = {zone_id: create_zone(spec) if zone_id in replaced else zones[zone_id] for zone_id, spec in self.zoneFile.items()}
+        self.zoneSet.zones = base_zones
+        self.zoneSet.signature = self.zoneFile.signature
+        self.zones = dict(base_zones)
+        for overlay in self.overlays:
+            self.zones.update(overlay.zones)
+        now = current_time()
+        for zone_id in replaced:
+            if self.overlays:
+                # replaced zones start timing once the overlays above them are popped
+                self.overlays[0].suspendedIds.append(zone_id)
+            else:
+                self.timers.schedule(zone_id, self.zones[zone_id].next_deadline(now))
+        self.partition = self.zoneFile.get_partition([surface.rect for surface in self.surfaces])
+        self.place_zones()
+        self.scheduler.wake()
+        self.redraw()
+        if metrics.enabled:
+            metrics.record_time("reload zone file", time.perf_counter() - start)
+
+    def partition_on_primary(self, zones, index):
+        # special zone sets are only shown on the primary screen
+        return [(list(zones), index)]
+
+    def place_zones(self):
+        """Hands every surface the zones of the base layer on its screen, surfaces other than the primary one are hidden while they have no zones"""
+        partition = self.partition or []
+        # parked zone sets keep the zones of each screen, so showing them again does not split them
+        surface_zones = self.zoneSet.get_surface_zones(partition) if partition else []
+        for number, surface in enumerate(self.surfaces):
+            if number < len(partition):
+                zone_ids, index = partition[number]
+                zones = surface_zones[number]
+            else:
+                zone_ids, index, zones = (), EMPTY_INDEX, dict()
+            surface.set_zones(zones, zone_ids, index)
+            surface.set_visible(surface is self.primarySurface or surface.has_zones())
+
+    def schedule_all_zones(self):
+        now = current_time()
+        for zoneID in self.zones:
+            self.timers.schedule(zoneID, self.zones[zoneID].next_deadline(now))
 
-    def add_zone(self, zone):
-        zone_id = len(self.zones)
-        self.zones[zone_id]=zone
-        zone.add_to_map(self.color_map, zone_id)
-            
     def disable(self) -> None:        
-        self.canvas.unregister("draw", self.draw) 
-        self.canvas.unregister("mouse", self.on_mouse)
-        cron.cancel(self.job)
+        self.enabled = False
+        for surface in self.surfaces:
+            surface.disable()
+        self.blockingSurface = None
+        self.scheduler.suspend()
+        self.executor.shutdown()
+        self.zoneSetBuilder.shutdown()
+        self.zoneSetPool.clear()
+        self.stop_recording()
         cron.cancel(self.job2)
-        self.canvas.blocks_mouse = False
+        cron.cancel(self.reevaluateJob)
+        self.reevaluateJob = None
+        ui.unregister("win_focus", self.on_window_change)
+        ui.unregister("win_title", self.on_window_change)
+        ui.unregister("screen_change", self.on_screen_change)
     def hide(self):
+        self.zoneSetBuilder.cancel()
+        self.pop_overlays()
         self.deactivate_zones()
         self.showZones = False        
-        self.canvas.blocks_mouse = False
+        self.timers.clear()
+        self.partition = None
+        self.place_zones()
+        self.release_mouse()
+        if not TOGGLE_ZONE_ENABLED:
+            self.scheduler.suspend()
+        self.redraw()
+
+    def redraw(self):
+        # redraws the frozen canvases once, the zones canvases only if their static zones changed
+        self.redrawPending = False
+        for surface in self.surfaces:
+            # the primary overlay also shows the toggle and window name
+            surface.redraw(surface is self.primarySurface)
+
+    def release_mouse(self):
+        for surface in self.surfaces:
+            surface.canvas.blocks_mouse = False
+        self.blockingSurface = None
        
     def deactivate_zones(self):
         if not self.showZones:
             return
         for c in self.zones:
             self.zones[c].deactivate()
-        self.canvas.blocks_mouse = False
+        self.release_mouse()
         
-    def draw(self, canvas) -> None:  
-        x, y = ctrl.mouse_pos()
+    def draw(self, canvas, surface=None) -> None:  
+        if surface is None:
+            surface = self.primarySurface
+        if surface is not self.primarySurface:
+            if self.showZones:
+                surface.render_overlay(canvas)
+            return
         
         paint = canvas.paint
                 
         if self.showZones:
-            paint.color = rgba2hex(64,128,64,ZONE_TOGGLE_SWITCH_ALPHA)
+            paint.color = TOGGLE_SHOWING_COLOR
         else:
-            paint.color = rgba2hex(128,128,128,ZONE_TOGGLE_SWITCH_ALPHA)
+            paint.color = TOGGLE_HIDDEN_COLOR
         if TOGGLE_ZONE_ENABLED: canvas.draw_rect(self.toggleRect)
         
         if SHOW_WINDOW_NAME:
-            paint.color = rgba2hex(255,255,255,200)
+            paint.color = WINDOW_NAME_COLOR
             text = self.get_active_window_title()
-            tr = paint.measure_text(text)[1]
+            tr = measure_text(paint, text)
             center = self.toggleRect.center
             canvas.draw_text(text,center.x-tr.width/2,center.y+tr.height*3)  
               
         if self.showZones==False:
             return
 
-        paint.color = rgba2hex(255,255,255,ZONES_ALPHA)
-        #canvas.draw_image(self.img, 0,0)
-        
-        for c in self.zones:
-            self.zones[c].draw(canvas)
-        pass
+        surface.render_overlay(canvas)
+
+    def draw_zones(self, canvas, surface=None) -> None:
+        if surface is None:
+            surface = self.primarySurface
+        if self.showZones==False:
+            surface.discard_static()
+            return
+        surface.render_static(canvas)
     
     def on_mouse(self, event):
+        if not self.scheduler.is_suspended():
+            self.scheduler.wake()
+        if event.event=="mousemove":
+            position = getattr(event, "gpos", None)
+            if position is None:
+                self.on_pointer_sample(*ctrl.mouse_pos())
+            else:
+                self.on_pointer_sample(position.x, position.y)
+            return
         x, y = ctrl.mouse_pos()  
+        if self.recorder is not None:
+            self.recorder.mouse(current_time(), event.event, x, y)
             
         if TOGGLE_ZONE_ENABLED and event.event=="mouseup" and self.toggleRect.contains(x,y):
             self.toggle_showing()
@@ -317,74 +520,253 @@ class Master:
         id = self.activeID
         if event.event=="mouseup" and id != TRANSPARENT:
             self.zones[id].click()
+            self.timers.schedule(id, self.zones[id].next_deadline(current_time()))
             pass
 
     def toggle_showing(self):
-        if not self.showZones:
+        # zones still being built count as shown, so toggling again cancels them
+        showing = self.showZones or self.zoneSetBuilder.is_pending()
+        if self.recorder is not None:
+            self.recorder.visible(current_time(), not showing)
+        if not showing:
             self.show()
         else:
             self.hide()
     
     def update(self):   
         x, y = ctrl.mouse_pos()   
-        
-        block = False   
-        
-        if TOGGLE_ZONE_ENABLED and self.toggleRect.contains(x,y):
-            block = True
+        now = current_time()
+        zoneUpdates = self.zoneUpdateCount
+        if self.recorder is not None:
+            self.recorder.tick(now, x, y)
+        moved = (x, y) != self.lastMousePosition
+        # zones are due before the hover change reschedules any of them, so no zone is updated twice in one tick
+        due = self.timers.pop_due(now) if self.showZones else ()
+        previousID = self.activeID
+        changed = self.apply_pointer(x, y, now)
+        hoverUpdated = (previousID, self.activeID) if self.activeID != previousID else ()
              
         if self.showZones:        
-            colorID = self.get_active_zone_id()
-            #if colorID!=None:
+            # only zones whose hover state changed or whose timers are due can do anything this tick
+            for zoneID in due:
+                if zoneID in self.zones and zoneID not in hoverUpdated:
+                    changed = self.update_zone(zoneID, now) or changed
+            self.scheduler.schedule_deadline(self.timers.next_deadline(), now)
+                
+        self.scheduler.report_activity(moved or changed)
+        self.redrawPending = self.redrawPending or changed
+        if self.redrawPending and self.scheduler.should_draw():
+            self.redraw()
+        if metrics.enabled:
+            metrics.record_value("zones updated per tick", self.zoneUpdateCount - zoneUpdates)
+
+    def apply_pointer(self, x, y, now) -> bool:
+        """Applies a pointer sample to the hover state of the zones, returns True if the appearance of a zone changed"""
+        self.lastMousePosition = (x, y)
+        block = TOGGLE_ZONE_ENABLED and self.toggleRect.contains(x,y)
+        changed = False
+        surface = self.find_surface(x, y)
+        if self.showZones:
+            if metrics.enabled:
+                start = time.perf_counter()
+                zone_id = self.query_zone(x, y, surface)
+                metrics.record_time("hit test", time.perf_counter() - start)
+            else:
+                zone_id = self.query_zone(x, y, surface)
+            colorID = self.hoverFilter.filter(zone_id, x, y, self.zones)
+            previousID = self.activeID
             self.activeID=colorID
             
             if self.activeID != TRANSPARENT and self.activeID is not None:
                 block = True
-                
-            for zoneID in self.zones:
-                isHovering = zoneID==self.activeID
-                self.zones[zoneID].update(isHovering)
-                
-        self.canvas.blocks_mouse = block
-            
-        pass
+
+            if colorID != previousID:
+                changed = True
+                for zoneID in (previousID, colorID):
+                    if zoneID in self.zones:
+                        changed = self.update_zone(zoneID, now) or changed
+        self.set_blocks_mouse(surface, block)
+        return changed
+
+    def on_pointer_sample(self, x, y):
+        # hover changes take effect as the pointer moves rather than at the next tick
+        now = current_time()
+        if self.recorder is not None:
+            self.recorder.pointer(now, x, y)
+        changed = self.apply_pointer(x, y, now)
+        if not changed:
+            return
+        if self.showZones:
+            self.scheduler.schedule_deadline(self.timers.next_deadline(), now)
+        self.redrawPending = True
+
+    def update_zone(self, zoneID, now) -> bool:
+        """Updates the zone and schedules its next deadline, returns True if its appearance changed"""
+        self.zoneUpdateCount += 1
+        zone = self.zones[zoneID]
+        textColor = zone.textColor
+        zone.update(zoneID==self.activeID, now)
+        self.timers.schedule(zoneID, zone.next_deadline(now))
+        if zone.textColor == textColor:
+            return False
+        for surface in self.surfaces:
+            surface.zone_changed(zoneID)
+        return True
+
+    def set_blocks_mouse(self, surface, block):
+        # only the canvas under the pointer can block it
+        if self.blockingSurface is not surface and self.blockingSurface is not None:
+            self.blockingSurface.canvas.blocks_mouse = False
+        self.blockingSurface = surface
+        if surface is not None:
+            surface.canvas.blocks_mouse = block
 
     def should_update(self):
         return self.updateTriggered or (not is_special_zone(self.overrideZoneSet) and (self.activeZoneSet != self.get_optimal_file_name()))
 
     def slow_update(self):
-        if not self.showZones:
+        start = time.perf_counter() if metrics.enabled else 0.0
+        self.on_window_title(self.poll_active_window_title())
+        # catches screen changes whose event was missed
+        self.update_screens(ui.screens())
+        if ZONE_FILE_HOT_RELOAD:
+            self.reload_zone_file()
+        if metrics.enabled:
+            metrics.record_time("slow update", time.perf_counter() - start)
+
+    def on_screen_change(self, *args):
+        self.update_screens(ui.screens())
+
+    def update_screens(self, screens):
+        """Matches the surfaces to the screens, surfaces of screens that did not move or change size are kept"""
+        keys = [compute_rect_key(screen.rect) for screen in screens]
+        if not screens or keys == [surface.key for surface in self.surfaces]:
+            return
+        unused = dict()
+        for surface in self.surfaces:
+            unused.setdefault(surface.key, []).append(surface)
+        surfaces = []
+        for screen, key in zip(screens, keys):
+            reusable = unused.get(key)
+            if reusable:
+                surface = reusable.pop()
+                surface.screen = screen
+            else:
+                surface = self.create_surface(screen)
+                if self.enabled:
+                    surface.enable()
+            surfaces.append(surface)
+        for reusable in unused.values():
+            for surface in reusable:
+                surface.close()
+        self.surfaces = surfaces
+        self.primarySurface = surfaces[0]
+        self.cursorSurface = self.primarySurface
+        self.blockingSurface = None
+        self.screen = self.primarySurface.screen
+        self.screenRect = self.primarySurface.rect
+        self.zonesRect = self.screenRect
+        self.toggleRect = self.compute_toggle_rect()
+        self.keyboard.update_size(self.screen.width, self.screen.height//2)
+        if self.showZones and self.zoneFile is not None:
+            # the zones keep their state, only the way they are split between the screens changes
+            self.partition = self.zoneFile.get_partition([surface.rect for surface in self.surfaces])
+        self.place_zones()
+        # kept surfaces still hold the overlay layers and new ones hold none, the primary screen may have changed too
+        for surface in surfaces:
+            while len(surface.layers) > 1:
+                surface.pop_layer()
+        for overlay in self.overlays:
+            self.push_overlay_layers(overlay)
+        self.hoverFilter.reset()
+        self.redraw()
+
+    def on_window_change(self, window):
+        try:
+            if window != ui.active_window():
+                return
+            title = window.title
+        except Exception:
+            title = self.poll_active_window_title()
+        self.on_window_title(title)
+
+    def on_window_title(self, title):
+        if title == self.lastWindowTitle:
+            return
+        if self.recorder is not None:
+            self.recorder.title(current_time(), title)
+        self.lastWindowTitle = title
+        if SHOW_WINDOW_NAME:
+            self.redraw()
+        self.set_zone_override(None)
+
+    def reevaluate_zone_set(self):
+        self.reevaluateJob = None
+        if not self.showZones and not self.zoneSetBuilder.is_pending():
             return
-        t = self.get_active_window_title()
         if self.should_update():
-            self.hide()
+            # the shown zones keep working until the new zone set replaces them
             self.show()
-            self.updateTriggered = False
-
-        if t != self.lastWindowTitle:
-           self.set_zone_override(None)
-        self.lastWindowTitle = t
-        pass
+        self.updateTriggered = False
     
-    def get_active_zone_id(self):
-        x, y = ctrl.mouse_pos() 
-        if not self.zonesRect.contains(x,y):
+    def find_surface(self, x, y):
+        """Returns the surface of the screen under the pointer or None"""
+        surface = self.cursorSurface
+        if surface.rect.contains(x, y):
+            return surface
+        for surface in self.surfaces:
+            if surface.rect.contains(x, y):
+                self.cursorSurface = surface
+                return surface
+        return None
+
+    def query_zone(self, x, y, surface):
+        # only the index of the screen under the pointer is searched
+        if surface is None:
             return TRANSPARENT
-        color = self.color_map.get((x,y), TRANSPARENT)
-        
-        
-        if color not in self.zones:
-            #print("There is no config matching %s!"%color) 
-            return None         
-              
-                
-        return color
+        zone_id = surface.query(x, y)
+        # the last page of a list leaves some zones of the shared index empty
+        if zone_id not in self.zones:
+            return TRANSPARENT
+        return zone_id
       
+    def start_recording(self, path: str):
+        """Records the pointer, mouse events, window titles and zone set changes to a trace, see TraceRecorder"""
+        self.stop_recording()
+        now = current_time()
+        self.recorder = TraceRecorder(path, now)
+        self.recorder.title(now, self.lastWindowTitle)
+        self.recorder.override(now, self.overrideZoneSet)
+        self.recorder.visible(now, self.showZones)
+
+    def stop_recording(self) -> str:
+        """Stops recording and returns the path of the trace, or None if nothing was being recorded"""
+        if self.recorder is None:
+            return None
+        recorder = self.recorder
+        self.recorder = None
+        recorder.close()
+        return recorder.path
+
+    def collect_metrics(self) -> dict:
+        """The measurements kept regardless of whether metrics are enabled"""
+        return {
+            "actions": self.executor.to_dict(),
+            "zone_set_cache": {"hits": self.zone_set_cache.hits, "misses": self.zone_set_cache.misses},
+            "zone_set_pool": {"hits": self.zoneSetPool.hits, "misses": self.zoneSetPool.misses, "parked": len(self.zoneSetPool)},
+            "tick_overruns": self.scheduler.overruns,
+            "screens": len(self.surfaces),
+        }
+
+    def summarize_metrics(self) -> list[str]:
+        lines = ["action %s"%line for line in self.executor.summary()]
+        lines.append("zone set cache: %d hits, %d misses"%(self.zone_set_cache.hits, self.zone_set_cache.misses))
+        lines.append("zone set pool: %d hits, %d misses, %d parked"%(self.zoneSetPool.hits, self.zoneSetPool.misses, len(self.zoneSetPool)))
+        lines.append("tick overruns since start: %d"%self.scheduler.overruns)
+        return lines
+
     def get_optimal_file_name(self):
-        validFiles = list()
-        for file in os.listdir(HOME_DIRECTORY):
-            if file.endswith(".txt"):
-                validFiles.append(file[:len(file)-4])
+        validFiles = self.zone_set_directory.get_names()
         
         if self.overrideZoneSet != None:
             if self.overrideZoneSet not in validFiles:
@@ -397,75 +779,84 @@ class Master:
             return DEFAULT_FILE_NAME
                 
         if len(validFiles) == 1:
-            return validFiles[0]
+            return next(iter(validFiles))
                 
-        t = self.get_active_window_title()
-        for f in validFiles:
-            if f in t:
-                return f
+        match = self.zone_set_directory.match_title(self.get_active_window_title())
+        if match is not None:
+            return match
         
         return DEFAULT_FILE_NAME
     
     def get_active_window_title(self):
-        return ui.active_window().title
+        return self.lastWindowTitle
+
+    def poll_active_window_title(self):
+        try:
+            return ui.active_window().title
+        except Exception:
+            return self.lastWindowTitle
      
 master = None
 
 def setup():
     global master
+    metrics.enabled = METRICS_ENABLED
     master = Master()
     master.enable(DEFAULT_SHOW)
     
 def primative_interaction(action:Union[Callable, str]):
     """All interactions ever fired are fired here."""
-    if isinstance(action, Callable):
-        action()
-        return 
-    
-    global master
     try:
-        if action[:5]=="bind:":
-            actions.user.keybinder_add_key_bind(action[6:].replace('\n',''))
-            pass
-        elif action[:7]=="unbind:":
-            actions.user.keybinder_remove_key_bind(action[8:].replace('\n',''))
-        elif action[:5]=="swap:":
-            if (master==None):
-                print("Null master, please restart talon or report a bug if this persists.")
-            master.set_zone_override(action[6:].strip())
-        elif action == 'language': 
-            if (master==None):
-                print("Null master, please restart talon or report a bug if this persists.")
-            zone_override = actions.code.language()
-            master.set_zone_override(zone_override.replace('\n',''))
-        elif action[:6]=="start:":
-            os.startfile(action[7:].replace('\n',''))
-        elif action[:12]=="scroll down:":
-           actions.user.mouse_scroll_down(float(action[13:].replace('\n','')))     
-        elif action[:10]=="scroll up:":
-           actions.user.mouse_scroll_up(float(action[11:].replace('\n','')))
-        elif action[:6]=="mimic:": # Not recommended for usage generally (can cause unexpected behaviour)
-            actions.user.engine_mimic(action[7:].replace('\n',''))
-        elif action.startswith(SNIPPET_ACTION_PREFIX):
-            snippet_name = action[len(SNIPPET_ACTION_PREFIX):]
-            if len(snippet_name) == 0:
-                print("Snippet interaction zone action is missing name!")
-            else:
-                actions.user.insert_snippet_by_name(snippet_name)
-                master.set_zone_override(DEFAULT_FILE_NAME)
-        elif action.startswith(OPERATOR_ACTION_PREFIX):
-            operator_name = action[len(OPERATOR_ACTION_PREFIX):]
-            actions.user.code_operator(operator_name)
-            master.set_zone_override(DEFAULT_FILE_NAME)
-        elif not (action.startswith(' ') or action.endswith(' ')):
-            actions.key(action)
-        else:
-            raise ValueError("Action not recognized")
-    except ValueError:
-        actions.insert(action)
+        compile_action(action)()
     except Exception as e:
         print(str(e))
 
+def toggle_metrics():
+    metrics.enabled = not metrics.enabled
+    print("Interaction zones metrics %s"%("enabled" if metrics.enabled else "disabled"))
+
+def print_metrics():
+    global master
+    lines = metrics.summary()
+    if master is not None:
+        lines += master.summarize_metrics()
+    if not metrics.enabled:
+        lines.insert(0, "Metrics are disabled, only the action executor and caches were measured")
+    print("\n".join(lines))
+
+def save_metrics() -> str:
+    """Writes the metrics as JSON to a new file in the zones directory and returns its path"""
+    global master
+    path = os.path.join(HOME_DIRECTORY, time.strftime("metrics-%Y%m%d-%H%M%S.json"))
+    extra = master.collect_metrics() if master is not None else None
+    metrics.save(path, extra)
+    print("Saved interaction zones metrics to %s"%path)
+    return path
+
+def start_recording() -> str:
+    """Starts recording a trace to a new file in the traces directory of the zones directory and returns its path"""
+    global master
+    directory = os.path.join(HOME_DIRECTORY, "traces")
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, time.strftime("%Y%m%d-%H%M%S.trace"))
+    master.start_recording(path)
+    print("Recording interaction zones trace to %s"%path)
+    return path
+
+def stop_recording():
+    global master
+    path = master.stop_recording()
+    if path is not None:
+        print("Saved interaction zones trace to %s"%path)
+
+def queue_interaction(action:Union[Callable, str], source=None, droppable=True):
+    """Runs the interaction outside of the update tick, see ActionExecutor"""
+    global master
+    if master is None:
+        primative_interaction(action)
+        return
+    master.executor.submit(compile_action(action), source, droppable)
+
 def toggle_showing():
     global master
     master.toggle_showing()
@@ -479,5 +870,10 @@ def is_special_zone(override_name) -> bool:
     return name in SPECIAL_ZONE_NAMES
 
 def compute_special_zone_name(override_name: str) -> str:
-    return override_name[len(SPECIAL_SWAP_NAME_PREFIX):]
+    # special zone sets can take an argument after their name, like ':KEYBOARD numpad'
+    return override_name[len(SPECIAL_SWAP_NAME_PREFIX):].split(" ", 1)[0]
+
+def compute_special_zone_argument(override_name: str) -> str:
+    parts = override_name[len(SPECIAL_SWAP_NAME_PREFIX):].split(" ", 1)
+    return parts[1].strip() if len(parts) > 1 else ""
     
\ No newline at end of file
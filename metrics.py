@@ -0,0 +1,118 @@
+import json
+import time
+
+# Histogram buckets hold values up to twice the previous bucket, timings are bucketed in microseconds
+BUCKET_COUNT = 40
+
+class Histogram:
+    __slots__ = ("scale", "unit", "count", "total", "maximum", "buckets")
+
+    def __init__(self, scale: float, unit: str):
+        """Counts values in power of two buckets, so recording is O(1) and percentiles are accurate to a factor of two.
+
+        Args:
+            scale: Values are multiplied by this before bucketing, 1e6 buckets seconds by microsecond
+            unit: The unit of the scaled values used in summaries
+        """
+        self.scale = scale
+        self.unit = unit
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.buckets = [0]*BUCKET_COUNT
+
+    def record(self, value: float):
+        scaled = value*self.scale
+        self.count += 1
+        self.total += scaled
+        if scaled > self.maximum:
+            self.maximum = scaled
+        bucket = int(scaled).bit_length() if scaled >= 1 else 0
+        self.buckets[min(bucket, BUCKET_COUNT - 1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the upper bound of the bucket holding the percentile, in scaled units"""
+        if self.count == 0:
+            return 0.0
+        remaining = fraction*self.count
+        for bucket, count in enumerate(self.buckets):
+            remaining -= count
+            if remaining <= 0:
+                return min(float(1 << bucket), self.maximum)
+        return self.maximum
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "no samples"
+        return "%d samples, mean %.1f%s, p50 %.0f%s, p99 %.0f%s, max %.1f%s"%(
+            self.count, self.total/self.count, self.unit,
+            self.percentile(0.5), self.unit, self.percentile(0.99), self.unit,
+            self.maximum, self.unit)
+
+    def to_dict(self) -> dict:
+        return {
+            "unit": self.unit,
+            "count": self.count,
+            "mean": self.total/self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p90": self.percentile(0.9),
+            "p99": self.percentile(0.99),
+            "max": self.maximum,
+            "buckets": {str(1 << bucket): count for bucket, count in enumerate(self.buckets) if count},
+        }
+
+class Metrics:
+    def __init__(self):
+        """Histograms and counters for the hot paths.
+
+        Recording is off until enabled, and instrumented code checks enabled before reading the clock,
+        so disabled metrics cost an attribute lookup per instrumented call.
+        """
+        self.enabled = False
+        self.histograms = dict()
+        self.counters = dict()
+        self.started = time.time()
+
+    def reset(self):
+        self.histograms = dict()
+        self.counters = dict()
+        self.started = time.time()
+
+    def record_time(self, name: str, seconds: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram(1e6, "us")
+            self.histograms[name] = histogram
+        histogram.record(seconds)
+
+    def record_value(self, name: str, value: float):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram(1, "")
+            self.histograms[name] = histogram
+        histogram.record(value)
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def summary(self) -> list[str]:
+        lines = ["%s: %s"%(name, histogram.summary()) for name, histogram in sorted(self.histograms.items())]
+        lines.extend("%s: %d"%(name, count) for name, count in sorted(self.counters.items()))
+        return lines
+
+    def to_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "duration": time.time() - self.started,
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            "counters": dict(self.counters),
+        }
+
+    def save(self, path: str, extra: dict = None):
+        data = self.to_dict()
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+
+metrics = Metrics()
@@ -0,0 +1,145 @@
+import struct
+
+TRACE_MAGIC = b"IZTR"
+TRACE_VERSION = 1
+# Records are written to the file once this many bytes are buffered
+FLUSH_SIZE = 65536
+
+# record kinds
+TICK = 1
+POINTER = 2
+MOUSE = 3
+TITLE = 4
+OVERRIDE = 5
+VISIBLE = 6
+
+MOUSE_EVENT_NAMES = ("mousedown", "mouseup")
+
+HEADER = struct.Struct("<4sH")
+KIND_AND_TIME = struct.Struct("<Bd")
+POSITION = struct.Struct("<ff")
+MOUSE_EVENT = struct.Struct("<Bff")
+TEXT_LENGTH = struct.Struct("<H")
+FLAG = struct.Struct("<B")
+
+class TraceRecord:
+    __slots__ = ("kind", "time", "x", "y", "event", "text", "flag")
+
+    def __init__(self, kind: int, time: float, x=0.0, y=0.0, event=None, text=None, flag=False):
+        self.kind = kind
+        self.time = time
+        self.x = x
+        self.y = y
+        self.event = event
+        self.text = text
+        self.flag = flag
+
+class TraceRecorder:
+    def __init__(self, path: str, start: float):
+        """Records what the zones react to as a compact binary trace.
+
+        Every record starts with its kind as a byte and its time in seconds since start as a double. Update ticks
+        and pointer events add the pointer position as two floats, mouse events their event and position, and
+        window titles and zone set overrides their text as a length prefixed UTF-8 string.
+
+        Args:
+            path: The trace file, it is overwritten
+            start: The time the trace starts at, record times are relative to it
+        """
+        self.path = path
+        self.start = start
+        self.buffer = bytearray(HEADER.pack(TRACE_MAGIC, TRACE_VERSION))
+        self.recordCount = 0
+        self.file = open(path, "wb")
+
+    def tick(self, now: float, x: float, y: float):
+        self.buffer += KIND_AND_TIME.pack(TICK, now - self.start)
+        self.buffer += POSITION.pack(x, y)
+        self._recorded()
+
+    def pointer(self, now: float, x: float, y: float):
+        self.buffer += KIND_AND_TIME.pack(POINTER, now - self.start)
+        self.buffer += POSITION.pack(x, y)
+        self._recorded()
+
+    def mouse(self, now: float, event: str, x: float, y: float):
+        if event not in MOUSE_EVENT_NAMES:
+            return
+        self.buffer += KIND_AND_TIME.pack(MOUSE, now - self.start)
+        self.buffer += MOUSE_EVENT.pack(MOUSE_EVENT_NAMES.index(event), x, y)
+        self._recorded()
+
+    def title(self, now: float, title: str):
+        self._text(TITLE, now, title)
+
+    def override(self, now: float, override_name: str):
+        self._text(OVERRIDE, now, override_name)
+
+    def visible(self, now: float, visible: bool):
+        self.buffer += KIND_AND_TIME.pack(VISIBLE, now - self.start)
+        self.buffer += FLAG.pack(1 if visible else 0)
+        self._recorded()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer = bytearray()
+
+    def _text(self, kind: int, now: float, text: str):
+        # None is stored as an empty string
+        data = (text or "").encode("utf-8")[:65535]
+        self.buffer += KIND_AND_TIME.pack(kind, now - self.start)
+        self.buffer += TEXT_LENGTH.pack(len(data))
+        self.buffer += data
+        self._recorded()
+
+    def _recorded(self):
+        self.recordCount += 1
+        if len(self.buffer) >= FLUSH_SIZE:
+            self.flush()
+
+def read_trace(path: str) -> list[TraceRecord]:
+    """Reads every record of a trace, raises ValueError if the file is not a trace"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError("%s is not an interaction zones trace"%path)
+    magic, version = HEADER.unpack_from(data, 0)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION:
+        raise ValueError("%s is not a version %d interaction zones trace"%(path, TRACE_VERSION))
+    records = []
+    offset = HEADER.size
+    try:
+        _read_records(data, offset, records, path)
+    except struct.error:
+        # the last record was cut off, for example because talon exited while recording
+        pass
+    return records
+
+def _read_records(data: bytes, offset: int, records: list, path: str):
+    while offset + KIND_AND_TIME.size <= len(data):
+        kind, time = KIND_AND_TIME.unpack_from(data, offset)
+        offset += KIND_AND_TIME.size
+        if kind == TICK or kind == POINTER:
+            x, y = POSITION.unpack_from(data, offset)
+            offset += POSITION.size
+            records.append(TraceRecord(kind, time, x, y))
+        elif kind == MOUSE:
+            event, x, y = MOUSE_EVENT.unpack_from(data, offset)
+            offset += MOUSE_EVENT.size
+            records.append(TraceRecord(kind, time, x, y, event=MOUSE_EVENT_NAMES[event]))
+        elif kind == TITLE or kind == OVERRIDE:
+            length, = TEXT_LENGTH.unpack_from(data, offset)
+            offset += TEXT_LENGTH.size
+            text = data[offset:offset + length].decode("utf-8", errors="replace")
+            offset += length
+            records.append(TraceRecord(kind, time, text=text))
+        elif kind == VISIBLE:
+            flag, = FLAG.unpack_from(data, offset)
+            offset += FLAG.size
+            records.append(TraceRecord(kind, time, flag=bool(flag)))
+        else:
+            raise ValueError("unknown record kind %d at byte %d of %s"%(kind, offset - KIND_AND_TIME.size, path))
@@ -1,39 +1,149 @@
 from talon import Module, actions, app
 
-from collections import deque
+import atexit
+import heapq
+import math
+import os
+import time
+from collections import OrderedDict
+from .action_history import ActionHistory
+from .helpers import verify_home_dir
+from .settings import RECENT_ACTIONS_CAPACITY, RECENT_ACTIONS_HALF_LIFE, RECENT_ACTIONS_SAVED
+
+HISTORY_FILE_NAME = "recent_actions.log"
+
+class RecentEntry:
+	__slots__ = ("count", "lastUse")
+
+	def __init__(self, count: int, last_use: float):
+		self.count = count
+		self.lastUse = last_use
+
+	def compute_frecency(self, now: float) -> float:
+		"""The use count decayed by how long ago the entry was last used"""
+		return self.count*math.pow(0.5, (now - self.lastUse)/RECENT_ACTIONS_HALF_LIFE)
+
+	def compute_rank_key(self) -> float:
+		"""Orders entries the same way as their frecency at any time, without needing the current time"""
+		return math.log2(self.count) + self.lastUse/RECENT_ACTIONS_HALF_LIFE
 
 class ActionQueue:
 	def __init__(self, size: int):
+		"""The most recently used entries, up to size of them, with how often and when each was last used.
+
+		Inserting and evicting are O(1), the entries are only ranked when the ranking is asked for.
+		"""
 		self.size = size
-		self.queue = deque()
+		# ordered from least to most recently used
+		self.entries = OrderedDict()
+		# changes whenever the items change
+		self.version = 0
 	
-	def insert(self, entry):
-		if entry in self.queue:
-			self.queue.remove(entry)
-		self.queue.appendleft(entry)
-		if len(self.queue) > self.size:
-			self.queue.pop()
+	def insert(self, entry, now: float = None):
+		if now is None:
+			now = time.time()
+		self.add(entry, 1, now)
+
+	def add(self, entry, uses: int, last_use: float):
+		"""Records uses of the entry, the last of them at last_use, and makes it the most recently used entry"""
+		recent = self.entries.get(entry)
+		if recent is None:
+			self.entries[entry] = RecentEntry(uses, last_use)
+			if len(self.entries) > self.size:
+				self.entries.popitem(last=False)
+		else:
+			recent.count += uses
+			recent.lastUse = last_use
+			self.entries.move_to_end(entry)
+		self.version += 1
+
+	def create_empty(self):
+		return ActionQueue(self.size)
+
+	def absorb_older(self, older):
+		"""Merges in the entries of a queue that were all used before the entries of this one"""
+		if not older.entries:
+			return
+		for entry, recent in self.entries.items():
+			previous = older.entries.get(entry)
+			if previous is not None:
+				recent.count += previous.count
+			older.entries[entry] = recent
+			older.entries.move_to_end(entry)
+		while len(older.entries) > self.size:
+			older.entries.popitem(last=False)
+		self.entries = older.entries
+		self.version += 1
+
+	def get_count(self, entry) -> int:
+		recent = self.entries.get(entry)
+		return 0 if recent is None else recent.count
+
+	def get_last_use(self, entry) -> float:
+		recent = self.entries.get(entry)
+		return None if recent is None else recent.lastUse
+
+	def get_recent_items(self, limit: int = None):
+		"""Returns the entries from most to least recently used"""
+		items = []
+		for entry in reversed(self.entries):
+			if limit is not None and len(items) >= limit:
+				break
+			items.append(entry)
+		return items
+
+	def get_ranked_items(self, limit: int = None):
+		"""Returns the entries from the highest to the lowest frecency, ties go to the more recently used"""
+		items = reversed(self.entries.items())
+		rank_key = lambda item: item[1].compute_rank_key()
+		if limit is None:
+			ranked = sorted(items, key=rank_key, reverse=True)
+		else:
+			ranked = heapq.nlargest(limit, items, key=rank_key)
+		return [entry for entry, _ in ranked]
 
 	def get_items(self):
-		return sorted([i for i in self.queue])
+		return self.get_ranked_items()
+
+	def __len__(self):
+		return len(self.entries)
+
+insert_queue = ActionQueue(RECENT_ACTIONS_CAPACITY)
+key_queue = ActionQueue(RECENT_ACTIONS_CAPACITY)
+
+history = None
+if RECENT_ACTIONS_SAVED:
+	history = ActionHistory(os.path.join(verify_home_dir(), HISTORY_FILE_NAME), {"insert": insert_queue, "key": key_queue})
 
-QUEUE_SIZE = 100
-insert_queue = ActionQueue(QUEUE_SIZE)
-key_queue = ActionQueue(QUEUE_SIZE)
+def ensure_history_loaded():
+	"""The saved history is only read once the recent actions are first needed"""
+	if history is not None:
+		history.ensure_loaded()
 
 def get_argument(action):
 	return action.get_arguments()[0]
 
 def on_action(action):
-	if action.get_name() == "insert":
+	name = action.get_name()
+	if name == "insert":
 		text = get_argument(action)
-		insert_queue.insert(text)
-	elif action.get_name() == "key":
+		now = time.time()
+		insert_queue.insert(text, now)
+		if history is not None:
+			history.record("insert", text, now)
+	elif name == "key":
 		keystroke = get_argument(action)
-		key_queue.insert(keystroke)
+		now = time.time()
+		key_queue.insert(keystroke, now)
+		if history is not None:
+			history.record("key", keystroke, now)
 
 def on_ready():
 	actions.user.basic_action_recorder_register_callback_function_with_name(on_action, "interaction zones listener")
+	if history is not None:
+		history.start()
+		# talon has no hook for unloading a script, so the records still pending are written when talon exits
+		atexit.register(history.stop)
 
 app.register("ready", on_ready)
 
@@ -41,9 +151,11 @@ mod = Module()
 @mod.action_class
 class Actions:
 	def fire_chicken_interaction_zones_get_recent_inserts():
-		"""Returns recently inserted text"""
+		"""Returns recently inserted text, the most frequently and recently used first"""
+		ensure_history_loaded()
 		return insert_queue.get_items()
 
 	def fire_chicken_interaction_zones_get_recent_keystrokes():
-		"""Returns recent keystrokes"""
+		"""Returns recent keystrokes, the most frequently and recently used first"""
+		ensure_history_loaded()
 		return key_queue.get_items()
\ No newline at end of file
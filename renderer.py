@@ -0,0 +1,58 @@
+MAXIMUM_MEASURED_TEXTS = 4096
+
+_text_measurements = dict()
+
+def measure_text(paint, text: str):
+    """Memoized paint.measure_text(text)[1] keyed by the text and text size"""
+    key = (text, paint.textsize)
+    measurement = _text_measurements.get(key)
+    if measurement is None:
+        if len(_text_measurements) >= MAXIMUM_MEASURED_TEXTS:
+            _text_measurements.clear()
+        measurement = paint.measure_text(text)[1]
+        _text_measurements[key] = measurement
+    return measurement
+
+class ZoneRenderer:
+    def __init__(self):
+        """Splits drawing the zones between a static layer and an overlay.
+
+        The static layer holds every zone in its resting appearance and is only redrawn when the zone set
+        changes. The overlay draws the labels of the highlighted zones, the zones whose appearance differs
+        from their resting appearance, over the static layer, so a frame and a zone starting or stopping
+        being highlighted only cost those zones.
+        """
+        self.zones = dict()
+        self.highlighted = set()
+        self.staticDirty = True
+        self.overlayDirty = True
+
+    def reset(self, zones: dict):
+        self.zones = zones
+        self.highlighted = {zone_id for zone_id, zone in zones.items() if zone.is_highlighted()}
+        self.staticDirty = True
+        self.overlayDirty = True
+
+    def zone_changed(self, zone_id):
+        """Called after the appearance of the zone changed, zones this renderer does not draw are ignored"""
+        zone = self.zones.get(zone_id)
+        if zone is None:
+            return
+        self.overlayDirty = True
+        if zone.is_highlighted():
+            self.highlighted.add(zone_id)
+        else:
+            self.highlighted.discard(zone_id)
+
+    def draw_static(self, canvas):
+        self.staticDirty = False
+        for zone in self.zones.values():
+            zone.draw_resting(canvas)
+
+    def draw_overlay(self, canvas):
+        self.overlayDirty = False
+        zones = self.zones
+        for zone_id in sorted(self.highlighted):
+            zone = zones.get(zone_id)
+            if zone is not None:
+                zone.draw_label(canvas)
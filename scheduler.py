@@ -0,0 +1,117 @@
+import math
+import time
+from talon import cron
+from .timers import INFINITY, now as current_time
+from .metrics import metrics
+
+# While ticks overrun, only every nth tick is allowed to redraw
+OVERRUN_DRAW_EVERY = 4
+
+class TickScheduler:
+    def __init__(self, callback, active_interval: int, idle_interval: int, idle_delay: float):
+        """Runs the callback on a cron interval that adapts to activity.
+
+        The tick runs every active_interval milliseconds while there is activity, drops to every idle_interval
+        milliseconds once there has been no activity for idle_delay seconds and can be suspended entirely.
+        Deadlines closer than the next regular tick get their own one shot tick, so timers keep their
+        resolution at the idle rate. Ticks that take longer than the current interval are counted as overruns,
+        and while ticks overrun the scheduler asks for draws to be skipped so that action timing is not delayed further.
+
+        Args:
+            callback: The tick function
+            active_interval: The interval in milliseconds used while there is activity
+            idle_interval: The interval in milliseconds used while idle
+            idle_delay: The number of seconds without activity before going idle
+        """
+        self.callback = callback
+        self.active_interval = active_interval
+        self.idle_interval = idle_interval
+        self.idle_delay = idle_delay
+        self.interval = None
+        self.job = None
+        self.deadlineJob = None
+        self.deadline = INFINITY
+        self.lastActivity = current_time()
+        self.overruns = 0
+        self.overrunning = False
+        self._ticks_since_draw = 0
+
+    def wake(self):
+        """Switches to the active interval right away"""
+        self.lastActivity = current_time()
+        self._set_interval(self.active_interval)
+
+    def suspend(self):
+        self._set_interval(None)
+        self._cancel_deadline()
+
+    def schedule_deadline(self, deadline: float, now: float):
+        """Makes sure a tick runs at the deadline even if the regular interval would only tick later"""
+        if deadline == INFINITY:
+            self._cancel_deadline()
+            return
+        if self.deadlineJob is not None and self.deadline <= deadline:
+            return
+        delay = math.ceil((deadline - now)*1000)
+        if delay <= 0:
+            # a zone that is due again right away waits for one active interval instead of spinning
+            delay = self.active_interval
+        if self.interval is not None and delay >= self.interval:
+            return
+        self._cancel_deadline()
+        self.deadline = deadline
+        self.deadlineJob = cron.after(f'{delay}ms', self._on_deadline)
+
+    def is_suspended(self) -> bool:
+        return self.interval is None
+
+    def report_activity(self, active: bool):
+        """Called by the tick to report whether anything is happening that needs the active rate"""
+        now = current_time()
+        if active:
+            self.lastActivity = now
+            self._set_interval(self.active_interval)
+        elif now - self.lastActivity >= self.idle_delay:
+            self._set_interval(self.idle_interval)
+
+    def should_draw(self) -> bool:
+        """Returns False while overrunning ticks should skip drawing"""
+        if not self.overrunning or self._ticks_since_draw + 1 >= OVERRUN_DRAW_EVERY:
+            self._ticks_since_draw = 0
+            return True
+        self._ticks_since_draw += 1
+        return False
+
+    def tick(self):
+        start = time.perf_counter()
+        self.callback()
+        duration = (time.perf_counter() - start)*1000
+        interval = self.interval if self.interval is not None else self.active_interval
+        self.overrunning = duration > interval
+        if self.overrunning:
+            self.overruns += 1
+        if metrics.enabled:
+            metrics.record_time("tick", duration/1000)
+            if self.overrunning:
+                metrics.count("tick overruns")
+
+    def _on_deadline(self):
+        self.deadlineJob = None
+        self.deadline = INFINITY
+        self.tick()
+
+    def _cancel_deadline(self):
+        if self.deadlineJob is not None:
+            cron.cancel(self.deadlineJob)
+            self.deadlineJob = None
+        self.deadline = INFINITY
+
+    def _set_interval(self, interval):
+        if interval == self.interval:
+            return
+        if self.job is not None:
+            cron.cancel(self.job)
+            self.job = None
+        self.interval = interval
+        if interval is not None:
+            self.job = cron.interval(f'{interval}ms', self.tick)
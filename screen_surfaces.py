@@ -0,0 +1,233 @@
+import time
+from talon import canvas
+from talon.skia import Paint, Rect
+from .helpers import TRANSPARENT, rgba2hex
+from .metrics import metrics
+from .renderer import ZoneRenderer
+from .spatial_index import ZoneIndex
+
+# hides the zones of the layers below an overlay, which are drawn on a canvas of their own
+OVERLAY_BACKDROP_COLOR = rgba2hex(32,32,32,255)
+
+def compute_rect_key(rect) -> tuple:
+    return (rect.x, rect.y, rect.width, rect.height)
+
+def compute_bounds(zones) -> tuple:
+    """The left, top, right and bottom of the rectangle around the zones, None if there are none"""
+    bounds = None
+    for zone in zones:
+        right = zone.left + zone.width
+        bottom = zone.top + zone.height
+        if bounds is None:
+            bounds = (zone.left, zone.top, right, bottom)
+        else:
+            bounds = (min(bounds[0], zone.left), min(bounds[1], zone.top), max(bounds[2], right), max(bounds[3], bottom))
+    return bounds
+
+class SurfaceLayer:
+    __slots__ = ("zoneIds", "index", "renderer", "globalIds", "bounds", "backdrop")
+
+    def __init__(self, zones: dict, zone_ids, index: ZoneIndex, global_ids: dict = None, blocking: bool = False):
+        """The zones of one layer shown on a screen.
+
+        Args:
+            zones: The zones of the layer by zone id
+            zone_ids: The ids of the zones in the index
+            index: The hit-test index of the layer
+            global_ids: Maps the ids in the index to zone ids, None if they are the zone ids
+            blocking: Points around the zones of the layer do not reach the layers below it either, and the layers
+                below it are not shown there
+        """
+        self.zoneIds = zone_ids
+        self.index = index
+        self.globalIds = global_ids
+        self.renderer = ZoneRenderer()
+        self.renderer.reset(zones)
+        self.bounds = compute_bounds(zones.values()) if blocking else None
+        self.backdrop = None
+        if self.bounds is not None:
+            left, top, right, bottom = self.bounds
+            self.backdrop = Rect(left, top, right - left, bottom - top)
+
+class ScreenSurface:
+    def __init__(self, screen, draw_static, draw_overlay, on_mouse):
+        """The canvases and the layers of zones shown on one screen.
+
+        The base layer holds the zones of the shown zone set, overlays pushed on top of it have their own
+        hit-test index and renderer, so pushing or popping an overlay leaves the layers below it as they are.
+        The rectangle around the zones of an overlay hides the layers below it from the pointer and is drawn opaque.
+        Overlays are drawn on the canvas of the highlighted zones, so they never redraw the resting zones of the base layer.
+
+        Args:
+            screen: The talon screen
+            draw_static: Called with the canvas and surface to draw the zones in their resting appearance
+            draw_overlay: Called with the canvas and surface to draw the highlighted zones
+            on_mouse: Called with the mouse events of the overlay canvas
+        """
+        self.screen = screen
+        self.rect = screen.rect.copy()
+        self.key = compute_rect_key(self.rect)
+        self.drawStatic = draw_static
+        self.drawOverlay = draw_overlay
+        self.onMouse = on_mouse
+        # zones in their resting appearance are drawn on their own canvas, which is only redrawn when they change
+        self.zonesCanvas = canvas.Canvas.from_screen(screen)
+        self.canvas = canvas.Canvas.from_screen(screen)
+        self.layers = [SurfaceLayer(dict(), (), ZoneIndex())]
+        # set when an overlay was pushed or popped, which the renderers of the remaining layers do not notice
+        self.layersChanged = False
+        self.visible = True
+        self.enabled = False
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.zonesCanvas.register("draw", self.draw_static)
+        self.canvas.register("draw", self.draw_overlay)
+        self.canvas.register("mouse", self.onMouse)
+        # the canvases are only redrawn when the update asks for it
+        self.zonesCanvas.freeze()
+        self.canvas.freeze()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.zonesCanvas.unregister("draw", self.draw_static)
+        self.canvas.unregister("draw", self.draw_overlay)
+        self.canvas.unregister("mouse", self.onMouse)
+        self.canvas.blocks_mouse = False
+
+    def close(self):
+        self.disable()
+        self.zonesCanvas.close()
+        self.canvas.close()
+
+    def set_zones(self, zones: dict, zone_ids, index: ZoneIndex):
+        """Shows the zones in the base layer, zones holds the zones with the given ids and index holds exactly those zones"""
+        self.layers[0] = SurfaceLayer(zones, zone_ids, index)
+
+    def push_layer(self, zones: dict, zone_ids, index: ZoneIndex, global_ids: dict = None):
+        self.layers.append(SurfaceLayer(zones, zone_ids, index, global_ids, True))
+        self.layersChanged = True
+
+    def pop_layer(self):
+        if len(self.layers) > 1:
+            self.layers.pop()
+            self.layersChanged = True
+
+    def has_zones(self) -> bool:
+        for layer in self.layers:
+            if layer.zoneIds:
+                return True
+        return False
+
+    def query(self, x, y):
+        """Returns the id of the zone under the point in the top-most layer that has one, or TRANSPARENT.
+
+        Points around the zones of an overlay are TRANSPARENT, like the gaps between the zones of the base layer.
+        """
+        layers = self.layers
+        for number in range(len(layers) - 1, -1, -1):
+            layer = layers[number]
+            if not layer.zoneIds:
+                continue
+            zone_id = layer.index.query(x, y)
+            if zone_id != TRANSPARENT:
+                if layer.globalIds is None:
+                    return zone_id
+                # the last page of a list leaves some zones of its index empty
+                return layer.globalIds.get(zone_id, TRANSPARENT)
+            bounds = layer.bounds
+            if bounds is not None and bounds[0] <= x < bounds[2] and bounds[1] <= y < bounds[3]:
+                return TRANSPARENT
+        return TRANSPARENT
+
+    def zone_changed(self, zone_id):
+        for layer in self.layers:
+            layer.renderer.zone_changed(zone_id)
+
+    def render_static(self, canvas):
+        self.layers[0].renderer.draw_static(canvas)
+
+    def render_overlay(self, canvas):
+        layers = self.layers
+        layers[0].renderer.draw_overlay(canvas)
+        for number in range(1, len(layers)):
+            layer = layers[number]
+            if layer.backdrop is not None:
+                paint = canvas.paint
+                paint.style = Paint.Style.FILL
+                paint.color = OVERLAY_BACKDROP_COLOR
+                canvas.draw_rect(layer.backdrop)
+            layer.renderer.draw_static(canvas)
+            layer.renderer.draw_overlay(canvas)
+
+    def discard_static(self):
+        self.layers[0].renderer.staticDirty = False
+
+    def set_visible(self, visible: bool):
+        # hidden canvases are not drawn at all, so screens without zones cost nothing
+        if visible == self.visible:
+            return
+        self.visible = visible
+        if visible:
+            self.zonesCanvas.show()
+            self.canvas.show()
+        else:
+            self.canvas.blocks_mouse = False
+            self.zonesCanvas.hide()
+            self.canvas.hide()
+
+    def redraw(self, overlay: bool):
+        if not self.visible:
+            return
+        layers = self.layers
+        overlay = overlay or self.layersChanged or layers[0].renderer.overlayDirty
+        self.layersChanged = False
+        for number in range(1, len(layers)):
+            renderer = layers[number].renderer
+            overlay = overlay or renderer.staticDirty or renderer.overlayDirty
+        if layers[0].renderer.staticDirty:
+            self.zonesCanvas.freeze()
+        if overlay:
+            self.canvas.freeze()
+
+    def draw_static(self, canvas):
+        if not metrics.enabled:
+            self.drawStatic(canvas, self)
+            return
+        start = time.perf_counter()
+        self.drawStatic(canvas, self)
+        metrics.record_time("draw static", time.perf_counter() - start)
+
+    def draw_overlay(self, canvas):
+        if not metrics.enabled:
+            self.drawOverlay(canvas, self)
+            return
+        start = time.perf_counter()
+        self.drawOverlay(canvas, self)
+        metrics.record_time("draw overlay", time.perf_counter() - start)
+
+def partition_zones(zones, rects: list) -> list:
+    """Splits the zones by the screen containing their centre, zones outside every screen go to the first one.
+
+    Args:
+        zones: The zone ids and zones as pairs
+        rects: The screen rects
+
+    Returns a list holding the zone ids and a hit-test index for each of the rects.
+    """
+    partition = [([], ZoneIndex()) for _ in rects]
+    for zone_id, zone in zones:
+        x, y = zone.centre
+        screen_number = 0
+        for number, rect in enumerate(rects):
+            if rect.contains(x, y):
+                screen_number = number
+                break
+        zone_ids, index = partition[screen_number]
+        zone_ids.append(zone_id)
+        zone.add_to_index(index, zone_id)
+    return partition
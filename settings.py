@@ -31,4 +31,47 @@ SHOW_WINDOW_NAME = False
 # Automatically change the zones depending on the active window. This requires that the file name contains the name of the window.
 # EX: For window "user - Visual Studio Code", the file name should probably contain Visual Studio Code.
 # If no matching file can be found for a window, the file with the above set DEFAULT_FILE_NAME will be used.
+# If the window name contains several file names, the longest one is used.
 EXPERIMENTAL_AUTO_ZONE_CHANGE = False
+
+# The number of parsed zone files kept in memory so that swapping between them does not read and parse the files again.
+ZONE_SET_CACHE_SIZE = 8
+# Applies edits to the shown zone file while it is shown, zones that were not edited keep their hover and trigger state.
+ZONE_FILE_HOT_RELOAD = True
+# Parses zone files and creates their zones on a worker thread, the shown zones keep working until the new ones are ready.
+BACKGROUND_ZONE_SET_BUILD = True
+# The number of zone files swapped away from that are kept with their zones, so swapping back shows them without building them again.
+PARKED_ZONE_SET_COUNT = 4
+# Trigger zones that are on stay on while their zone file is swapped away from, otherwise they are switched off as when the zones are hidden.
+PARKED_ZONE_SET_KEEPS_TRIGGERS = False
+# Zones keep their warmup and repeat timers while swapped away from, otherwise they come back as when first shown, with 'start awake' zones awake.
+PARKED_ZONE_SET_KEEPS_TIMERS = False
+
+# How often in milliseconds the zones are updated while the pointer moves or a zone is about to fire.
+ACTIVE_UPDATE_INTERVAL_MS = 16
+# How often in milliseconds the zones are updated while nothing is happening.
+IDLE_UPDATE_INTERVAL_MS = 100
+# The number of seconds without activity before switching to the idle update interval.
+IDLE_UPDATE_DELAY = 0.5
+
+# The most entries shown at once by the special zone sets (snippets, operators and recent actions). Longer lists get previous and next page zones.
+SPECIAL_ZONES_PAGE_SIZE = 48
+# The smallest grid cell in pixels the special zone sets use before moving entries onto further pages.
+SPECIAL_ZONES_MINIMUM_WIDTH = 120
+SPECIAL_ZONES_MINIMUM_HEIGHT = 60
+
+# The number of distinct recent inserts and keystrokes remembered for the recent action zone sets.
+RECENT_ACTIONS_CAPACITY = 1000
+# The number of seconds after which a use of a recent insert or keystroke counts half as much when ranking them.
+RECENT_ACTIONS_HALF_LIFE = 3600
+# If true, recent inserts and keystrokes are saved in InteractionZones/recent_actions.log and survive restarting talon.
+# Off by default as the log holds everything inserted, including anything sensitive that was dictated.
+RECENT_ACTIONS_SAVED = False
+
+# How many pixels the pointer has to move past the edge of a hovered zone before it stops hovering it.
+# Keeps eye tracker jitter along the edge of a zone from restarting its warmup, 0 turns this off.
+HOVER_EXIT_MARGIN = 10
+
+# If true, the interaction zones measure how long updating, drawing and showing zones takes from the start.
+# Metrics can also be toggled with "interaction zones metrics toggle", printed and saved as JSON in InteractionZones.
+METRICS_ENABLED = False
@@ -0,0 +1,95 @@
+from .helpers import TRANSPARENT
+
+DEFAULT_CELL_SIZE = 64
+
+class ZoneIndex:
+    def __init__(self, cell_size: int = DEFAULT_CELL_SIZE) -> None:
+        """Uniform grid of buckets used to find the zone under a point.
+
+        Every zone rectangle is registered in each grid cell it overlaps, so a point query only
+        has to look at the handful of zones sharing its cell. When zones overlap, the zone
+        added last wins, matching the order in which zones are drawn.
+
+        Args:
+            cell_size: The width and height of a grid cell in pixels.
+        """
+        self.cell_size = cell_size
+        self.buckets = dict()
+        self.rects = dict()
+        self._last_point = None
+        self._last_result = TRANSPARENT
+
+    def add(self, zone_id, left, top, width, height):
+        """Registers the rectangle of a zone. The zone covers left <= x < left + width and top <= y < top + height."""
+        if zone_id in self.rects:
+            self.remove(zone_id)
+        right = left + width
+        bottom = top + height
+        self.rects[zone_id] = (left, top, right, bottom)
+        if width <= 0 or height <= 0:
+            self._invalidate()
+            return
+        entry = (zone_id, left, top, right, bottom)
+        for cell in self._compute_cells(left, top, right, bottom):
+            bucket = self.buckets.get(cell)
+            if bucket is None:
+                self.buckets[cell] = [entry]
+            else:
+                # Most recently added zones sit at the front of the bucket so the first hit is the top-most zone
+                bucket.insert(0, entry)
+        self._invalidate()
+
+    def remove(self, zone_id):
+        rect = self.rects.pop(zone_id, None)
+        if rect is None:
+            return
+        for cell in self._compute_cells(*rect):
+            bucket = self.buckets.get(cell)
+            if bucket is None:
+                continue
+            bucket[:] = [entry for entry in bucket if entry[0] != zone_id]
+            if not bucket:
+                del self.buckets[cell]
+        self._invalidate()
+
+    def clear(self):
+        self.buckets = dict()
+        self.rects = dict()
+        self._invalidate()
+
+    def query(self, x, y):
+        """Returns the id of the top-most zone containing the point or TRANSPARENT if there is none."""
+        point = (x, y)
+        if point == self._last_point:
+            return self._last_result
+        result = TRANSPARENT
+        cell_size = self.cell_size
+        bucket = self.buckets.get((int(x // cell_size), int(y // cell_size)))
+        if bucket:
+            for zone_id, left, top, right, bottom in bucket:
+                if left <= x < right and top <= y < bottom:
+                    result = zone_id
+                    break
+        self._last_point = point
+        self._last_result = result
+        return result
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, zone_id):
+        return zone_id in self.rects
+
+    def _compute_cells(self, left, top, right, bottom):
+        cell_size = self.cell_size
+        first_column = int(left // cell_size)
+        last_column = int((right - 1) // cell_size)
+        first_row = int(top // cell_size)
+        last_row = int((bottom - 1) // cell_size)
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield (column, row)
+
+    def _invalidate(self):
+        self._last_point = None
+        self._last_result = TRANSPARENT
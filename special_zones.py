@@ -0,0 +1,331 @@
+import math
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from talon import actions
+from .helpers import TriggerType
+from .settings import DEFAULT_FILE_NAME, SPECIAL_ZONES_PAGE_SIZE, SPECIAL_ZONES_MINIMUM_WIDTH, SPECIAL_ZONES_MINIMUM_HEIGHT
+from .spatial_index import ZoneIndex
+from .zones import SimpleZone
+from .zone_actions import SNIPPET_ACTION_PREFIX
+from .keyboard import Keyboard, KeyboardLayouts, Key, DEFAULT_LAYOUT_NAME
+from . import recent_actions
+
+OPERATOR_NAMES = ["SUBSCRIPT",
+    "ASSIGNMENT",
+    "ASSIGNMENT_OR",
+    "ASSIGNMENT_SUBTRACTION",
+    "ASSIGNMENT_ADDITION",
+    "ASSIGNMENT_MULTIPLICATION",
+    "ASSIGNMENT_DIVISION",
+    "ASSIGNMENT_MODULO",
+    "ASSIGNMENT_INCREMENT",
+    "ASSIGNMENT_BITWISE_AND",
+    "ASSIGNMENT_BITWISE_OR",
+    "ASSIGNMENT_BITWISE_EXCLUSIVE_OR",
+    "ASSIGNMENT_BITWISE_LEFT_SHIFT",
+    "ASSIGNMENT_BITWISE_RIGHT_SHIFT",
+    "BITWISE_AND",
+    "BITWISE_OR",
+    "BITWISE_NOT",
+    "BITWISE_EXCLUSIVE_OR",
+    "BITWISE_LEFT_SHIFT",
+    "BITWISE_RIGHT_SHIFT",
+    "LAMBDA",
+    "MATH_SUBTRACT",
+    "MATH_ADD",
+    "MATH_MULTIPLY",
+    "MATH_DIVIDE",
+    "MATH_INTEGER_DIVIDE",
+    "MATH_MODULO",
+    "MATH_EXPONENT",
+    "MATH_EQUAL",
+    "MATH_NOT_EQUAL",
+    "MATH_WEAK_EQUAL",
+    "MATH_WEAK_NOT_EQUAL",
+    "MATH_WEAK_AND",
+    "MATH_WEAK_OR",
+    "MATH_WEAK_NOT",
+    "MATH_GREATER_THAN",
+    "MATH_GREATER_THAN_OR_EQUAL",
+    "MATH_LESS_THAN",
+    "MATH_LESS_THAN_OR_EQUAL",
+    "MATH_AND",
+    "MATH_OR",
+    "MATH_NOT",
+    "MATH_IN",
+    "MATH_NOT_IN",
+    "POINTER_INDIRECTION",
+    "POINTER_ADDRESS_OF",
+    "POINTER_STRUCTURE_DEREFERENCE",]
+
+RETURN_ZONE_NAME = "swap default"
+RETURN_ZONE_ACTION = "swap: default"
+LIST_ZONE_COLOR = "#7aacddff"
+# zones at the end of a multi page list, after the entries of the page
+NAVIGATION_ZONE_COUNT = 3
+
+def create_list_zone(name, action, centre, dimensions) -> SimpleZone:
+    return SimpleZone(color=LIST_ZONE_COLOR, name=name, ttype=TriggerType.HOVER, action=action, warmup=1, repeatTime=1, modifiers="", centre=centre, dimensions=dimensions)
+
+def compute_page_capacity(number_of_entries, rect, page_size, minimum_width, minimum_height) -> int:
+    """Returns how many entries fit on a page without the grid cells getting smaller than the minimum size"""
+    most_per_row_and_column = max(1, min(rect.width//max(minimum_width, 1), rect.height//max(minimum_height, 1)))
+    most_cells = int(most_per_row_and_column*most_per_row_and_column)
+    if number_of_entries + 1 <= min(page_size + 1, most_cells):
+        return number_of_entries
+    return max(1, min(page_size, most_cells - NAVIGATION_ZONE_COUNT))
+
+class ListLayout:
+    def __init__(self, names, corresponding_actions, rect, page_size, minimum_width, minimum_height, ranked=False):
+        """The geometry of a paged list of entries laid out on a grid covering the rectangle.
+
+        A page shows up to capacity entries followed by a zone returning to the default zones. Lists with more
+        than one page also get zones for the previous and next page before the return zone. The geometry and
+        hit-test index are shared by every page, so flipping pages only changes the names and actions of the zones.
+        Entries of a ranked list, best first, go to the cells closest to the centre of the rectangle, which are the
+        quickest to reach.
+        """
+        if len(names) != len(corresponding_actions):
+            print("The number of names in the list did not match the number of actions!")
+            names = []
+            corresponding_actions = []
+        self.names = names
+        self.actions = corresponding_actions
+        self.capacity = compute_page_capacity(len(names), rect, page_size, minimum_width, minimum_height)
+        self.pageCount = max(1, math.ceil(len(names)/self.capacity)) if self.capacity else 1
+        self.isPaged = self.pageCount > 1
+        self.cellCount = self.capacity + (NAVIGATION_ZONE_COUNT if self.isPaged else 1)
+
+        left = rect.left
+        top = rect.top
+        height = rect.height
+        width = rect.width
+        number_per_row_and_column = math.ceil(math.sqrt(self.cellCount))
+        zone_width = math.floor(width/number_per_row_and_column)
+        zone_height = math.floor(height/number_per_row_and_column)
+        self.dimensions = (math.floor(0.65*zone_height), math.floor(0.65*zone_width))
+        def compute_dimensions(id):
+            x = left + ((id % number_per_row_and_column) + 1)*zone_width - 0.5*zone_width
+            y = top + ((id//number_per_row_and_column) + 1)*zone_height - 0.5*zone_height
+            return x, y
+        self.centres = [compute_dimensions(zone_number) for zone_number in range(self.cellCount)]
+        if ranked:
+            middle_x = left + width/2
+            middle_y = top + height/2
+            self.centres[:self.capacity] = sorted(self.centres[:self.capacity], key=lambda centre: (centre[0] - middle_x)**2 + (centre[1] - middle_y)**2)
+
+        self.index = ZoneIndex()
+        for zone_id, centre in enumerate(self.centres):
+            create_list_zone("", None, centre, self.dimensions).add_to_index(self.index, zone_id)
+
+    def get_page_entries(self, page):
+        start = page*self.capacity
+        return self.names[start:start + self.capacity], self.actions[start:start + self.capacity]
+
+class ListPager:
+    def __init__(self, layout: ListLayout, flip_page):
+        """Owns the zones of a list layout and reuses them when the page changes.
+
+        Args:
+            layout: The list layout
+            flip_page: Called with -1 or 1 by the previous and next page zones
+        """
+        self.layout = layout
+        self.page = 0
+        self.zones = dict()
+        self.slots = [create_list_zone("", None, centre, layout.dimensions) for centre in layout.centres[:layout.capacity]]
+        self.navigation = dict()
+        navigation_id = layout.capacity
+        if layout.isPaged:
+            self.navigation[navigation_id] = create_list_zone("previous page", lambda: flip_page(-1), layout.centres[navigation_id], layout.dimensions)
+            self.navigation[navigation_id + 1] = create_list_zone("next page", lambda: flip_page(1), layout.centres[navigation_id + 1], layout.dimensions)
+            navigation_id += 2
+        self.navigation[navigation_id] = create_list_zone(RETURN_ZONE_NAME, RETURN_ZONE_ACTION, layout.centres[navigation_id], layout.dimensions)
+        self.show_page(0)
+
+    def show_page(self, page):
+        """Puts the entries of the page on the slot zones, pages wrap around"""
+        layout = self.layout
+        self.page = page % layout.pageCount
+        names, corresponding_actions = layout.get_page_entries(self.page)
+        self.zones = dict()
+        for zone_id, (name, action) in enumerate(zip(names, corresponding_actions)):
+            zone = self.slots[zone_id]
+            zone.reassign(name, action)
+            self.zones[zone_id] = zone
+        for zone_id, zone in self.navigation.items():
+            if layout.isPaged and zone.name != RETURN_ZONE_NAME:
+                direction = "previous" if zone_id == layout.capacity else "next"
+                zone.reassign("%s page (%d/%d)"%(direction, self.page + 1, layout.pageCount), zone.action)
+            self.zones[zone_id] = zone
+
+class SpecialZoneProvider(ABC):
+    # whether the entries come best first and should get the cells that are quickest to reach
+    ranked = False
+
+    def __init__(self, master):
+        """Computes the entries of a special zone set and caches their layout until compute_version changes"""
+        self.master = master
+        self.version = None
+        self.layout = None
+        self.layoutRect = None
+
+    def compute_version(self):
+        """A cheap value that changes whenever the entries would change"""
+        return None
+
+    @abstractmethod
+    def compute_entries(self, version):
+        """Returns the names of the entries and their corresponding actions for the version"""
+
+    def get_layout(self, rect) -> ListLayout:
+        version = self.compute_version()
+        rect_key = (rect.left, rect.top, rect.width, rect.height)
+        if self.layout is None or version != self.version or rect_key != self.layoutRect:
+            names, corresponding_actions = self.compute_entries(version)
+            self.layout = ListLayout(names, corresponding_actions, rect, SPECIAL_ZONES_PAGE_SIZE, SPECIAL_ZONES_MINIMUM_WIDTH, SPECIAL_ZONES_MINIMUM_HEIGHT, self.ranked)
+            self.version = version
+            self.layoutRect = rect_key
+        return self.layout
+
+    def invalidate(self):
+        self.layout = None
+
+    def return_to_default(self):
+        self.master.set_zone_override(DEFAULT_FILE_NAME)
+
+class SnippetProvider(SpecialZoneProvider):
+    def compute_version(self):
+        # which snippets exist depends on the language
+        try:
+            language = actions.code.language()
+        except Exception:
+            language = ""
+        return (language, tuple(actions.user.get_snippet_names()))
+
+    def compute_entries(self, version):
+        _, snippet_names = version
+        relevant_snippet_names = []
+        for snippet_name in snippet_names:
+            try:
+                snippet = actions.user.get_snippet(snippet_name)
+                if snippet:
+                    relevant_snippet_names.append(snippet_name)
+            except Exception:
+                pass
+        relevant_snippet_names = sorted(relevant_snippet_names)
+        insert_actions = [SNIPPET_ACTION_PREFIX + name for name in relevant_snippet_names]
+        return relevant_snippet_names, insert_actions
+
+class RecentInsertsProvider(SpecialZoneProvider):
+    ranked = True
+
+    def compute_version(self):
+        recent_actions.ensure_history_loaded()
+        return recent_actions.insert_queue.version
+
+    def compute_entries(self, version):
+        recent_inserts = recent_actions.insert_queue.get_items()
+        def insert_text(text):
+            self.return_to_default()
+            actions.insert(text)
+        def create_operator(text):
+            return lambda: insert_text(text)
+        return recent_inserts, [create_operator(text) for text in recent_inserts]
+
+class RecentKeystrokesProvider(SpecialZoneProvider):
+    ranked = True
+
+    def compute_version(self):
+        recent_actions.ensure_history_loaded()
+        return recent_actions.key_queue.version
+
+    def compute_entries(self, version):
+        recent_keystrokes = recent_actions.key_queue.get_items()
+        def press_keystroke(keystroke):
+            self.return_to_default()
+            actions.key(keystroke)
+        def create_operator(keystroke):
+            return lambda: press_keystroke(keystroke)
+        return recent_keystrokes, [create_operator(keystroke) for keystroke in recent_keystrokes]
+
+class OperatorProvider(SpecialZoneProvider):
+    def compute_entries(self, version):
+        def insert_operator(operator_name):
+            try:
+                actions.user.code_operator(operator_name)
+            except Exception as ex:
+                print('operator_name', operator_name)
+            self.return_to_default()
+        def create_lambda(operator_name):
+            return lambda: insert_operator(operator_name)
+        return OPERATOR_NAMES, [create_lambda(operator_name) for operator_name in OPERATOR_NAMES]
+
+class KeyboardZoneSet:
+    def __init__(self, keyboard: Keyboard, rows: list[list[Key]]):
+        """The zones of a keyboard layout together with their hit-test index, built once per layout and keyboard size"""
+        def create_key_operator(key: Key):
+            return lambda: keyboard.handle_keypress(key)
+        self.zones = dict()
+        self.index = ZoneIndex()
+        keyboard.rows = rows
+        x = keyboard.x
+        y = keyboard.y
+        key_height = keyboard.compute_key_height()
+        key_width = 0
+        adjusted_height = round(key_height * 0.65)
+        for row_index in range(len(rows)):
+            key_width = keyboard.compute_row_key_width(row_index)
+            adjusted_width = round(key_width * 0.65)
+            for key in rows[row_index]:
+                key_text = f"{key.main_key} / {key.secondary_key}" if key.secondary_key else key.main_key
+                center_x = x + key_width // 2
+                center_y = y + key_height // 2
+                self.add(create_list_zone(key_text, create_key_operator(key), (center_x, center_y), (adjusted_height, adjusted_width)))
+                x += key_width
+            y += key_height
+            x = keyboard.x
+        center_x = x + key_width // 2
+        center_y = y + key_height // 2
+        self.add(create_list_zone(RETURN_ZONE_NAME, RETURN_ZONE_ACTION, (center_x, center_y), (key_height, key_width)))
+
+    def add(self, zone):
+        zone_id = len(self.zones)
+        self.zones[zone_id] = zone
+        zone.add_to_index(self.index, zone_id)
+
+    def reset(self):
+        """Returns every zone to the state of a freshly created zone"""
+        for zone in self.zones.values():
+            zone.reset_state()
+
+class KeyboardProvider:
+    def __init__(self, keyboard: Keyboard, directory: str, capacity: int = 4):
+        """Caches the zones of the keyboard layouts by layout and keyboard size, so showing a keyboard again only resets their state.
+
+        Args:
+            keyboard: The keyboard pressing the keys
+            directory: The directory holding the keyboard layout files
+            capacity: The number of keyboard zone sets kept
+        """
+        self.keyboard = keyboard
+        self.layouts = KeyboardLayouts(directory)
+        self.capacity = capacity
+        self.zoneSets = OrderedDict()
+
+    def get_zone_set(self, layout_name: str = None) -> KeyboardZoneSet:
+        """Returns the zones of the layout, raises FileNotFoundError if there is no such layout"""
+        if not layout_name:
+            layout_name = DEFAULT_LAYOUT_NAME
+        rows, signature = self.layouts.get(layout_name)
+        key = (layout_name, signature, self.keyboard._width, self.keyboard._height)
+        zone_set = self.zoneSets.get(key)
+        if zone_set is None:
+            zone_set = KeyboardZoneSet(self.keyboard, rows)
+            self.zoneSets[key] = zone_set
+            while len(self.zoneSets) > self.capacity:
+                self.zoneSets.popitem(last=False)
+        else:
+            zone_set.reset()
+        self.zoneSets.move_to_end(key)
+        return zone_set
@@ -0,0 +1,61 @@
+import heapq
+import time
+
+INFINITY = float("inf")
+
+clock = time.monotonic
+
+def now() -> float:
+    """The clock used for all zone timers"""
+    return clock()
+
+class TimerQueue:
+    def __init__(self):
+        """Min-heap of the next time each zone needs to be updated.
+
+        Rescheduling a zone pushes a new entry and leaves the old one in the heap; stale entries
+        are recognized by comparing them against the latest deadline of the zone and skipped when popped.
+        """
+        self.heap = []
+        self.deadlines = dict()
+        self._sequence = 0
+
+    def schedule(self, zone_id, deadline: float):
+        """Sets the next deadline of the zone, an infinite deadline removes it"""
+        if deadline == INFINITY:
+            self.deadlines.pop(zone_id, None)
+            return
+        if self.deadlines.get(zone_id) == deadline:
+            return
+        self.deadlines[zone_id] = deadline
+        self._sequence += 1
+        heapq.heappush(self.heap, (deadline, self._sequence, zone_id))
+
+    def unschedule(self, zone_id):
+        self.deadlines.pop(zone_id, None)
+
+    def pop_due(self, current_time: float) -> list:
+        """Removes and returns the ids of the zones whose deadline is at or before the current time"""
+        due = []
+        heap = self.heap
+        while heap and heap[0][0] <= current_time:
+            deadline, _, zone_id = heapq.heappop(heap)
+            if self.deadlines.get(zone_id) == deadline:
+                del self.deadlines[zone_id]
+                due.append(zone_id)
+        return due
+
+    def next_deadline(self) -> float:
+        heap = self.heap
+        while heap and self.deadlines.get(heap[0][2]) != heap[0][0]:
+            heapq.heappop(heap)
+        if heap:
+            return heap[0][0]
+        return INFINITY
+
+    def clear(self):
+        self.heap = []
+        self.deadlines = dict()
+
+    def __len__(self):
+        return len(self.deadlines)
@@ -0,0 +1,174 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Union, Callable
+from talon import actions
+from .settings import DEFAULT_FILE_NAME
+
+SNIPPET_ACTION_PREFIX = "snippet: "
+OPERATOR_ACTION_PREFIX = "operator: "
+MAXIMUM_COMPILED_ACTIONS = 4096
+
+def get_master():
+    from .master import master
+    if master is None:
+        print("Null master, please restart talon or report a bug if this persists.")
+    return master
+
+class ZoneAction(ABC):
+    """An action compiled from the action text of a zone. Calling it performs the action."""
+    __slots__ = ("text", "argument", "problem")
+    kind = "action"
+    # actions that do not touch talon can run on the action executor worker thread
+    thread_safe = False
+
+    def __init__(self, text: str, argument=None, problem: str = None):
+        self.text = text
+        self.argument = argument
+        # describes why the action text could not be compiled as intended
+        self.problem = problem
+
+    @abstractmethod
+    def __call__(self):
+        pass
+
+    def __repr__(self):
+        return "%s(%r)"%(type(self).__name__, self.text)
+
+class KeyBind(ZoneAction):
+    __slots__ = ()
+    kind = "bind"
+    def __call__(self):
+        actions.user.keybinder_add_key_bind(self.argument)
+
+class KeyUnbind(ZoneAction):
+    __slots__ = ()
+    kind = "unbind"
+    def __call__(self):
+        actions.user.keybinder_remove_key_bind(self.argument)
+
+class Swap(ZoneAction):
+    __slots__ = ()
+    kind = "swap"
+    def __call__(self):
+        get_master().set_zone_override(self.argument)
+
+class SwapToLanguage(ZoneAction):
+    __slots__ = ()
+    kind = "language"
+    def __call__(self):
+        master = get_master()
+        zone_override = actions.code.language()
+        master.set_zone_override(zone_override.replace('\n',''))
+
+class StartFile(ZoneAction):
+    __slots__ = ()
+    kind = "start"
+    thread_safe = True
+    def __call__(self):
+        os.startfile(self.argument)
+
+class ScrollDown(ZoneAction):
+    __slots__ = ()
+    kind = "scroll down"
+    def __call__(self):
+        actions.user.mouse_scroll_down(self.argument)
+
+class ScrollUp(ZoneAction):
+    __slots__ = ()
+    kind = "scroll up"
+    def __call__(self):
+        actions.user.mouse_scroll_up(self.argument)
+
+class Mimic(ZoneAction):
+    # Not recommended for usage generally (can cause unexpected behaviour)
+    __slots__ = ()
+    kind = "mimic"
+    def __call__(self):
+        actions.user.engine_mimic(self.argument)
+
+class InsertSnippet(ZoneAction):
+    __slots__ = ()
+    kind = "snippet"
+    def __call__(self):
+        if len(self.argument) == 0:
+            print("Snippet interaction zone action is missing name!")
+            return
+        actions.user.insert_snippet_by_name(self.argument)
+        get_master().set_zone_override(DEFAULT_FILE_NAME)
+
+class InsertOperator(ZoneAction):
+    __slots__ = ()
+    kind = "operator"
+    def __call__(self):
+        actions.user.code_operator(self.argument)
+        get_master().set_zone_override(DEFAULT_FILE_NAME)
+
+class PressKey(ZoneAction):
+    __slots__ = ()
+    kind = "key"
+    def __call__(self):
+        try:
+            actions.key(self.text)
+        except ValueError:
+            # text that is not a valid keystroke gets inserted instead
+            actions.insert(self.text)
+
+class InsertText(ZoneAction):
+    __slots__ = ()
+    kind = "insert"
+    def __call__(self):
+        actions.insert(self.text)
+
+def compile_float(action_type, text: str, argument: str):
+    try:
+        return action_type(text, float(argument))
+    except ValueError:
+        return InsertText(text, problem="'%s' is not a number, the text will be inserted instead"%argument)
+
+def compile_prefixed(text: str, prefix: str, action_type):
+    if not text.startswith(prefix):
+        return None
+    return action_type(text, text[len(prefix):])
+
+# maps the text up to and including the first colon to a function compiling the action
+PREFIX_COMPILERS = {
+    "bind:": lambda text: KeyBind(text, text[6:].replace('\n','')),
+    "unbind:": lambda text: KeyUnbind(text, text[8:].replace('\n','')),
+    "swap:": lambda text: Swap(text, text[6:].strip()),
+    "start:": lambda text: StartFile(text, text[7:].replace('\n','')),
+    "scroll down:": lambda text: compile_float(ScrollDown, text, text[13:].replace('\n','')),
+    "scroll up:": lambda text: compile_float(ScrollUp, text, text[11:].replace('\n','')),
+    "mimic:": lambda text: Mimic(text, text[7:].replace('\n','')),
+    "snippet:": lambda text: compile_prefixed(text, SNIPPET_ACTION_PREFIX, InsertSnippet),
+    "operator:": lambda text: compile_prefixed(text, OPERATOR_ACTION_PREFIX, InsertOperator),
+}
+
+_compiled_actions = dict()
+
+def compile_action(action: Union[Callable, str]) -> Callable:
+    """Compiles the action text of a zone into a callable, callables are returned unchanged. Compiled actions are shared, so they must not hold state."""
+    if not isinstance(action, str):
+        return action
+    compiled = _compiled_actions.get(action)
+    if compiled is None:
+        compiled = _compile_action_text(action)
+        if len(_compiled_actions) >= MAXIMUM_COMPILED_ACTIONS:
+            _compiled_actions.clear()
+        _compiled_actions[action] = compiled
+    return compiled
+
+def _compile_action_text(text: str) -> ZoneAction:
+    if text == 'language':
+        return SwapToLanguage(text)
+    colon = text.find(':')
+    if colon > 0:
+        compiler = PREFIX_COMPILERS.get(text[:colon + 1])
+        if compiler is not None:
+            compiled = compiler(text)
+            if compiled is not None:
+                return compiled
+    if not (text.startswith(' ') or text.endswith(' ')):
+        if colon > 0 and text[colon + 1:colon + 2] == ' ' and text[:colon].replace(' ', '').isalpha():
+            return PressKey(text, problem="unknown action '%s', it will be pressed as keys"%text[:colon + 1])
+        return PressKey(text)
+    return InsertText(text)
@@ -0,0 +1,161 @@
+import os
+from collections import OrderedDict
+from typing import NamedTuple
+from .config_parser import ZoneSpec, parse_zone_file, create_zone, iter_zone_specs, iter_lines
+from .zones import compute_zone_rect
+from .spatial_index import ZoneIndex
+from .screen_surfaces import compute_rect_key, partition_zones
+
+# The number of screen arrangements the zones of a zone set are kept split for
+MAXIMUM_PARTITIONS = 4
+
+class ZoneSetChange(NamedTuple):
+    """The zone ids affected by reloading a zone file, zones not listed kept their spec and id"""
+    added: list
+    changed: list
+    removed: list
+
+class CachedZoneSet:
+    def __init__(self, specs: list[ZoneSpec], index: ZoneIndex, signature: tuple):
+        """The parsed specs of a zone file together with the hit-test index built from them.
+
+        Zone ids start out as the positions of the specs in the list. Reloading the file keeps the ids
+        of zones whose spec did not change, so zones created from the specs share the index across reloads.
+        """
+        self.specs = specs
+        self.zoneIds = list(range(len(specs)))
+        self.nextZoneId = len(specs)
+        self.index = index
+        self.signature = signature
+        self.partitions = dict()
+
+    def items(self):
+        return zip(self.zoneIds, self.specs)
+
+    def get_partition(self, rects: list) -> list:
+        """The zone ids and hit-test index for each screen, see partition_zones"""
+        # a single screen shows every zone, whatever its size
+        key = None if len(rects) == 1 else tuple(compute_rect_key(rect) for rect in rects)
+        partition = self.partitions.get(key)
+        if partition is None:
+            if len(self.partitions) >= MAXIMUM_PARTITIONS:
+                self.partitions.clear()
+            if key is None:
+                partition = [(self.zoneIds, self.index)]
+            else:
+                partition = partition_zones(((zone_id, create_zone(spec)) for zone_id, spec in self.items()), rects)
+            self.partitions[key] = partition
+        return partition
+
+    def apply_specs(self, specs: list[ZoneSpec], signature: tuple) -> ZoneSetChange:
+        """Replaces the specs with the ones parsed from the changed file and updates the index in place.
+
+        Zones with an identical spec keep their id. Zones that only moved or were edited keep the id of the zone
+        they replace, matched by name and action, and are the only ones besides added and removed zones
+        registered in the index again. Partitions over several screens are split again when next requested.
+        """
+        unchanged = dict()
+        similar = dict()
+        for zone_id, spec in self.items():
+            unchanged.setdefault(spec, []).append(zone_id)
+            similar.setdefault(compute_spec_identity(spec), []).append(zone_id)
+        zone_ids = [None]*len(specs)
+        matched = set()
+        # identical specs are matched first, so an edited zone cannot take the id of an unchanged one
+        for position, spec in enumerate(specs):
+            candidates = unchanged.get(spec)
+            if candidates:
+                zone_ids[position] = candidates.pop(0)
+                matched.add(zone_ids[position])
+        added = []
+        changed = []
+        for position, spec in enumerate(specs):
+            if zone_ids[position] is not None:
+                continue
+            candidates = similar.get(compute_spec_identity(spec), [])
+            while candidates and candidates[0] in matched:
+                candidates.pop(0)
+            if candidates:
+                zone_id = candidates.pop(0)
+                changed.append(zone_id)
+            else:
+                zone_id = self.nextZoneId
+                self.nextZoneId += 1
+                added.append(zone_id)
+            zone_ids[position] = zone_id
+            matched.add(zone_id)
+        removed = [zone_id for zone_id in self.zoneIds if zone_id not in matched]
+
+        for zone_id in removed:
+            self.index.remove(zone_id)
+        self.specs = specs
+        self.zoneIds = zone_ids
+        self.signature = signature
+        self.partitions = dict()
+        specs_by_id = dict(self.items())
+        for zone_id in changed + added:
+            add_spec_to_index(self.index, zone_id, specs_by_id[zone_id])
+        return ZoneSetChange(added, changed, removed)
+
+class ZoneSetCache:
+    def __init__(self, capacity: int):
+        """Least recently used cache of parsed zone files keyed by path and validated by modification time and size."""
+        self.capacity = capacity
+        self.entries: OrderedDict[str, CachedZoneSet] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str) -> CachedZoneSet:
+        """Returns the cached zone set for the file or None if it is not cached or changed since it was cached.
+        Raises FileNotFoundError if the file does not exist."""
+        signature = compute_file_signature(path)
+        entry = self.entries.get(path)
+        if entry is not None and entry.signature == signature:
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, path: str, entry: CachedZoneSet):
+        self.entries[path] = entry
+        self.entries.move_to_end(path)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def reload(self, path: str, entry: CachedZoneSet) -> ZoneSetChange:
+        """Applies changes to the file to the zone set loaded from it, see CachedZoneSet.apply_specs.
+
+        Returns None if the file did not change. Raises FileNotFoundError if the file does not exist.
+        """
+        signature = compute_file_signature(path)
+        if entry.signature == signature:
+            return None
+        self.misses += 1
+        change = entry.apply_specs(parse_zone_file(path), signature)
+        self.store(path, entry)
+        return change
+
+def compute_file_signature(path: str) -> tuple:
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def compute_spec_identity(spec: ZoneSpec) -> tuple:
+    # what makes a zone the same zone after it was moved or its timing changed
+    return (spec.name, spec.action, spec.action2)
+
+def load_zone_set(path: str) -> CachedZoneSet:
+    """Parses the file and builds its index without touching any cache, so it can run on any thread"""
+    signature = compute_file_signature(path)
+    specs = []
+    index = ZoneIndex()
+    # the index is built as the specs are read
+    with open(path, "r") as f:
+        for zone_id, spec in enumerate(iter_zone_specs(iter_lines(f), path)):
+            specs.append(spec)
+            add_spec_to_index(index, zone_id, spec)
+    return CachedZoneSet(specs, index, signature)
+
+def add_spec_to_index(index: ZoneIndex, zone_id, spec: ZoneSpec):
+    # zones read from zone files have the default size, so their rect is known without creating them
+    index.add(zone_id, *compute_zone_rect(spec.centre))
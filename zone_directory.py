@@ -0,0 +1,92 @@
+import os
+import re
+import time
+
+ZONE_FILE_EXTENSION = ".txt"
+DIRECTORY_CHECK_INTERVAL = 1.0
+MAXIMUM_MEMOIZED_TITLES = 256
+
+class TitleMatcher:
+    def __init__(self, names):
+        """Finds the zone set name contained in a window title.
+
+        When several names occur in a title, the longest one wins and ties go to the name that
+        sorts first alphabetically. Results are memoized per title.
+        """
+        self.names = sorted(set(names), key=lambda name: (-len(name), name))
+        self.priorities = {name: priority for priority, name in enumerate(self.names)}
+        self.memo = dict()
+        if self.names:
+            alternatives = "|".join(re.escape(name) for name in self.names if name)
+            # the lookahead makes the search report a match starting at every position rather than only non overlapping ones
+            self.pattern = re.compile("(?=(%s))" % alternatives) if alternatives else None
+        else:
+            self.pattern = None
+
+    def match(self, title: str):
+        """Returns the highest priority name contained in the title or None if there is none."""
+        result = self.memo.get(title, self)
+        if result is not self:
+            return result
+        result = None
+        if self.pattern is not None:
+            best_priority = None
+            for found in self.pattern.finditer(title):
+                priority = self.priorities[found.group(1)]
+                if best_priority is None or priority < best_priority:
+                    best_priority = priority
+                    result = found.group(1)
+                    if priority == 0:
+                        break
+        if len(self.memo) >= MAXIMUM_MEMOIZED_TITLES:
+            self.memo.clear()
+        self.memo[title] = result
+        return result
+
+class ZoneSetDirectory:
+    def __init__(self, path: str, check_interval: float = DIRECTORY_CHECK_INTERVAL):
+        """Index of the zone sets available in a directory.
+
+        The directory is listed again only when its modification time changes, and the modification time
+        is checked at most once per check interval.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.names = frozenset()
+        self.matcher = TitleMatcher([])
+        self._signature = None
+        self._last_check = None
+
+    def get_names(self) -> frozenset:
+        self._refresh_if_due()
+        return self.names
+
+    def match_title(self, title: str):
+        self._refresh_if_due()
+        return self.matcher.match(title)
+
+    def refresh(self):
+        """Lists the directory again if it changed since the last listing"""
+        self._last_check = time.monotonic()
+        try:
+            signature = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            signature = None
+        if signature == self._signature:
+            return
+        self._signature = signature
+        names = []
+        if signature is not None:
+            for file in os.listdir(self.path):
+                if file.endswith(ZONE_FILE_EXTENSION):
+                    names.append(file[:len(file)-len(ZONE_FILE_EXTENSION)])
+        self.names = frozenset(names)
+        self.matcher = TitleMatcher(names)
+
+    def invalidate(self):
+        self._signature = None
+        self._last_check = None
+
+    def _refresh_if_due(self):
+        if self._last_check is None or time.monotonic() - self._last_check >= self.check_interval:
+            self.refresh()
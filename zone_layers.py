@@ -0,0 +1,30 @@
+from .zone_set_builder import ZoneSet
+
+class Overlay:
+    __slots__ = ("zoneSet", "depth", "zones", "globalIds", "suspendedIds")
+
+    def __init__(self, zone_set: ZoneSet, depth: int):
+        """A zone set shown on top of the base zone set and the overlays below it.
+
+        Zones of an overlay are keyed by its depth and their id in the zone set, so they never clash with
+        the zones of the layers below and the zone sets can be built without knowing where they are shown.
+
+        Args:
+            zone_set: The zone set, special zone sets are only shown on the primary screen
+            depth: 1 for the overlay right above the base zone set
+        """
+        self.zoneSet = zone_set
+        self.depth = depth
+        # the zones below whose timers were stopped while the overlay is shown
+        self.suspendedIds = []
+        self.refresh()
+
+    def refresh(self):
+        """Picks up the zones of the zone set again, after a list page flip for example"""
+        depth = self.depth
+        self.zones = {(depth, zone_id): zone for zone_id, zone in self.zoneSet.zones.items()}
+        self.globalIds = {zone_id: (depth, zone_id) for zone_id in self.zoneSet.zones}
+
+    def get_index(self):
+        # the zone ids and index on the primary screen
+        return self.zoneSet.partition[0]
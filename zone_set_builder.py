@@ -0,0 +1,159 @@
+import queue
+import threading
+from collections import deque
+from talon import cron
+from .config_parser import create_zone
+from .zone_cache import CachedZoneSet, load_zone_set, compute_file_signature
+
+class ZoneSet:
+    __slots__ = ("name", "zones", "partition", "listPager", "zoneFile", "zoneFilePath", "signature", "surfaceZones", "surfacePartition")
+
+    def __init__(self, name: str, zones: dict, partition: list = None, list_pager=None, zone_file: CachedZoneSet = None, zone_file_path: str = None):
+        """A fully built zone set waiting to be shown.
+
+        Args:
+            name: The name shown as the active zone set
+            zones: The zones by id
+            partition: The zone ids and hit-test index for each screen, None to split the zones of the zone file when shown
+            list_pager: The pager of a list zone set
+            zone_file: The cached zone set the zones were created from
+            zone_file_path: The path of the zone file
+        """
+        self.name = name
+        self.zones = zones
+        self.partition = partition
+        self.listPager = list_pager
+        self.zoneFile = zone_file
+        self.zoneFilePath = zone_file_path
+        # the version of the zone file the zones match
+        self.signature = zone_file.signature if zone_file is not None else None
+        self.surfaceZones = None
+        self.surfacePartition = None
+
+    def is_current(self) -> bool:
+        """Returns False if the zone file changed since the zones were created from it"""
+        if self.zoneFile is None:
+            return True
+        if self.signature != self.zoneFile.signature:
+            return False
+        try:
+            return compute_file_signature(self.zoneFilePath) == self.signature
+        except FileNotFoundError:
+            return False
+
+    def get_surface_zones(self, partition: list) -> list:
+        """The zones of each screen by id for the renderers, kept until the partition changes"""
+        if self.surfacePartition is not partition:
+            zones = self.zones
+            self.surfaceZones = [{zone_id: zones[zone_id] for zone_id in zone_ids} for zone_ids, _ in partition]
+            self.surfacePartition = partition
+        return self.surfaceZones
+
+def build_file_zone_set(name: str, path: str, zone_file: CachedZoneSet = None, items: list = None) -> ZoneSet:
+    """Creates the zones of a zone file, parsing it first unless it was cached.
+
+    Only reads the cached zone set through the items snapshot, so it can run on any thread.
+
+    Args:
+        name: The name of the zone set
+        path: The zone file
+        zone_file: The cached zone set of the file or None to parse it
+        items: The zone ids and specs of the cached zone set, taken on the talon thread
+    """
+    if zone_file is None:
+        zone_file = load_zone_set(path)
+        items = list(zone_file.items())
+    zones = {zone_id: create_zone(spec) for zone_id, spec in items}
+    return ZoneSet(name, zones, zone_file=zone_file, zone_file_path=path)
+
+class ZoneSetBuilder:
+    def __init__(self, threaded: bool):
+        """Builds zone sets off the talon thread and publishes them on it.
+
+        A build runs on a worker thread and hands its zone set to the publish callback from a cron.after callback,
+        so everything the zones are read by keeps using the shown zone set until the new one replaces it in one go.
+        Only the latest request is published, requests superseded or cancelled while building are discarded.
+
+        Args:
+            threaded: False builds and publishes immediately on the calling thread
+        """
+        self.threaded = threaded
+        self.generation = 0
+        self.pendingKey = None
+        self.lock = threading.Lock()
+        self.results = deque()
+        self.requests = None
+        self.worker = None
+        self.job = None
+
+    def submit(self, key, build, publish) -> bool:
+        """Builds the zone set with build() and calls publish with it, returns False if the same key is already being built"""
+        if key == self.pendingKey:
+            return False
+        self.generation += 1
+        self.pendingKey = key
+        if not self.threaded:
+            self._finish(self.generation, self._build(build), publish)
+            return True
+        self._get_requests().put((self.generation, build, publish))
+        return True
+
+    def cancel(self):
+        self.generation += 1
+        self.pendingKey = None
+
+    def shutdown(self):
+        """Discards every request and stops the worker thread, a later request starts a new one"""
+        self.cancel()
+        if self.worker is not None:
+            self.requests.put(None)
+            self.worker = None
+            self.requests = None
+
+    def is_pending(self) -> bool:
+        return self.pendingKey is not None
+
+    def _build(self, build):
+        try:
+            return build()
+        except Exception as e:
+            print("Failed to build zone set: %s"%e)
+            return None
+
+    def _finish(self, generation, zone_set, publish):
+        if generation != self.generation:
+            return
+        self.pendingKey = None
+        if zone_set is not None:
+            publish(zone_set)
+
+    def _get_requests(self):
+        if self.worker is None:
+            self.requests = queue.Queue()
+            self.worker = threading.Thread(target=self._work, args=(self.requests,), name="interaction zones builder", daemon=True)
+            self.worker.start()
+        return self.requests
+
+    def _work(self, requests):
+        # None is put on the queue to stop the worker
+        while True:
+            request = requests.get()
+            if request is None:
+                return
+            generation, build, publish = request
+            # requests superseded while waiting are not built at all
+            if generation != self.generation:
+                continue
+            zone_set = self._build(build)
+            with self.lock:
+                self.results.append((generation, zone_set, publish))
+                if self.job is None:
+                    self.job = cron.after('0ms', self._publish_results)
+
+    def _publish_results(self):
+        with self.lock:
+            self.job = None
+            results = list(self.results)
+            self.results.clear()
+        for generation, zone_set, publish in results:
+            self._finish(generation, zone_set, publish)
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from .zone_set_builder import ZoneSet
+
+class ZoneSetPool:
+    def __init__(self, capacity: int, keep_triggers: bool, keep_timers: bool):
+        """Recently shown zone sets parked with their zones, index and render cache, so showing one again costs no build.
+
+        Zone sets are keyed by name and screen geometry and evicted least recently parked first.
+
+        Args:
+            capacity: How many zone sets are kept, 0 keeps none
+            keep_triggers: Trigger zones that are on stay on while parked, otherwise they are switched off when parked
+            keep_timers: Zones keep their warmup and repeat timers while parked, otherwise they come back as when first shown
+        """
+        self.capacity = capacity
+        self.keepTriggers = keep_triggers
+        self.keepTimers = keep_timers
+        self.entries: OrderedDict[tuple, ZoneSet] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def park(self, key: tuple, zone_set: ZoneSet, now: float):
+        """Takes the zone set out of use, the pointer counts as having left its zones"""
+        for zone in zone_set.zones.values():
+            if zone.wasHovering:
+                zone.update(False, now)
+            if not self.keepTriggers and getattr(zone, "triggerValue", False):
+                zone.deactivate()
+            zone.park(self.keepTimers)
+        if self.capacity <= 0:
+            self.release(zone_set)
+            return
+        self.entries[key] = zone_set
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            _, evicted = self.entries.popitem(last=False)
+            self.release(evicted)
+
+    def take(self, key: tuple) -> ZoneSet:
+        """Removes and returns the zone set parked under the key if it is still current, otherwise None"""
+        zone_set = self.entries.pop(key, None)
+        if zone_set is not None and not zone_set.is_current():
+            self.release(zone_set)
+            zone_set = None
+        if zone_set is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return zone_set
+
+    def release(self, zone_set: ZoneSet):
+        # trigger zones left on would otherwise never get switched off
+        for zone in zone_set.zones.values():
+            if getattr(zone, "triggerValue", False):
+                zone.deactivate()
+
+    def clear(self):
+        for zone_set in self.entries.values():
+            self.release(zone_set)
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,15 +1,37 @@
 from talon.skia import Paint, Rect
-import time
 from .helpers import rgba2hex,TriggerType
+from .timers import now as current_time, INFINITY
+from .renderer import measure_text
+from .zone_actions import compile_action
 from .settings import *
 
+# computed once rather than on every update
+ZONE_COLOR = rgba2hex(0,0,0,ZONES_ALPHA)
+RESTING_TEXT_COLOR = rgba2hex(255,255,255,ZONES_TEXT_ALPHA)
+INTERACTED_TEXT_COLOR = rgba2hex(255,0,0,ZONES_TEXT_ALPHA)
+TRIGGERED_TEXT_COLOR = rgba2hex(255,0,0,255)
+# the width and height of zones read from zone files
+DEFAULT_ZONE_SIZE = 80
+
+def compute_zone_rect(centre, width=DEFAULT_ZONE_SIZE, height=DEFAULT_ZONE_SIZE) -> tuple:
+    """The left, top, width and height of a zone around the centre, as the zone itself computes them"""
+    x = round(centre[0])
+    y = round(centre[1])
+    return (x - width//2, y - height//2, width, height)
+
 class Zone:
-    def __init__(self,color,centre,name,ttype,action,warmup,repeatTime,modifiers, height= 80, width= 80) -> None:
-        self.color=rgba2hex(0,0,0,ZONES_ALPHA)
+    # zone sets can hold hundreds of zones, slots keep them small
+    __slots__ = ("color", "centre", "name", "triggerType", "action", "warmup", "repeatTime", "modifiers",
+        "height", "width", "top", "left", "rectangle", "modifierStartAwake", "modifierBlockInput",
+        "modifierTriggerOffOnExit", "wasHovering", "startTimer", "repeatTimer", "textColor",
+        "sinceInteractedTimer", "highlightDuration")
+
+    def __init__(self,color,centre,name,ttype,action,warmup,repeatTime,modifiers, height= DEFAULT_ZONE_SIZE, width= DEFAULT_ZONE_SIZE) -> None:
+        self.color=ZONE_COLOR
         self.centre=(round(centre[0]), round(centre[1]))
         self.name=name
         self.triggerType=ttype
-        self.action=action
+        self.action=compile_action(action)
         self.warmup=warmup
         self.repeatTime=repeatTime
         self.modifiers = modifiers
@@ -25,33 +47,43 @@ class Zone:
         self.modifierBlockInput = "block input" in modifiers
         self.modifierTriggerOffOnExit = "deactivate on exit" in modifiers
         
-        self.wasHovering = False
-        self.startTimer = 0
-        if self.modifierStartAwake:
-            self.repeatTimer=0
-        else:
-            self.repeatTimer=float("inf")
-        self.textColor=rgba2hex(255,255,255,ZONES_TEXT_ALPHA)
-        self.sinceInteractedTimer = 0
+        self.reset_state()
+        self.highlightDuration = min(0.5, max(self.repeatTime,0.15))-0.05
         
-    def interact(self):
-        self.sinceInteractedTimer = time.time()
+    def interact(self, now=None):
+        self.sinceInteractedTimer = current_time() if now is None else now
    
-    def fire_interaction(self, action:str): 
-        from .master import primative_interaction     
-        primative_interaction(action)
+    def fire_interaction(self, action, droppable=True): 
+        from .master import queue_interaction     
+        queue_interaction(action, self, droppable)
                   
-    def update(self,isHovering:bool):
+    def update(self,isHovering:bool, now=None):
+        """Only needs to be called when the hover state changes or the deadline from next_deadline passes"""
+        if now is None:
+            now = current_time()
         if self.wasHovering!=isHovering:
-            self.on_hover_change(isHovering)
+            self.on_hover_change(isHovering, now)
             
-        self.textColor = rgba2hex(255,255,255,ZONES_TEXT_ALPHA)
-        if time.time() - self.sinceInteractedTimer <= min(0.5, max(self.repeatTime,0.15))-0.05:
-            self.textColor = rgba2hex(255,0,0,ZONES_TEXT_ALPHA)
+        self.textColor = RESTING_TEXT_COLOR
+        if now - self.sinceInteractedTimer < self.highlightDuration:
+            self.textColor = INTERACTED_TEXT_COLOR
                     
         self.wasHovering=isHovering
+
+    def next_deadline(self, now) -> float:
+        """Returns the time at which the zone next needs an update to fire or change its text color"""
+        deadline = INFINITY
+        if self.repeatTimer != INFINITY and self.startTimer != INFINITY:
+            deadline = max(self.startTimer + self.warmup, self.repeatTimer + self.repeatTime)
+        highlightEnd = self.sinceInteractedTimer + self.highlightDuration
+        if highlightEnd > now and highlightEnd < deadline:
+            deadline = highlightEnd
+        return deadline
+    
+    def is_highlighted(self) -> bool:
+        return self.textColor != RESTING_TEXT_COLOR
     
-    def on_hover_change(self,isHovering:bool):
+    def on_hover_change(self,isHovering:bool, now=None):
         if self.triggerType != TriggerType.HOVER:
             return
         
@@ -67,80 +99,132 @@ class Zone:
         # immediately set up the conditions for interaction to occur in the update method
         if self.type==TriggerType.CLICK:
             self.dirtyTrigger = True    
-            self.startTimer = time.time()
+            self.startTimer = current_time()
             self.repeatTimer = 0
         pass
     
     def draw(self, canvas):
-        
+        self.draw_zone(canvas, self.textColor)
+
+    def draw_resting(self, canvas):
+        self.draw_zone(canvas, RESTING_TEXT_COLOR)
+
+    def draw_zone(self, canvas, text_color):
         paint = canvas.paint
         paint.text_align = canvas.paint.TextAlign.LEFT
         paint.textsize = 10
         paint.style = Paint.Style.FILL
         text = self.name
-        tr = paint.measure_text(text)[1]
+        tr = measure_text(paint, text)
         
         x=self.left
         y=self.centre[1]
         
         paint.color = self.color
         canvas.draw_rect(self.rectangle)
-        paint.color = self.textColor
+        paint.color = text_color
         canvas.draw_text(text,x,y-tr.y)
         pass
+
+    def draw_label(self, canvas):
+        """Draws the label in its current color over the resting one, without drawing the zone again"""
+        paint = canvas.paint
+        paint.text_align = canvas.paint.TextAlign.LEFT
+        paint.textsize = 10
+        paint.style = Paint.Style.FILL
+        text = self.name
+        tr = measure_text(paint, text)
+
+        x=self.left
+        y=self.centre[1]
+
+        # the zone's own fill dims the resting label underneath, so the zone keeps its look
+        paint.color = self.color
+        canvas.draw_rect(Rect(x + tr.x - 1, y - 1, tr.width + 2, tr.height + 2))
+        paint.color = self.textColor
+        canvas.draw_text(text,x,y-tr.y)
     
+    def reassign(self, name, action):
+        """Reuses the zone for another entry, its timers and highlight are reset"""
+        self.name = name
+        self.action = compile_action(action)
+        self.reset_state()
+
+    def reset_state(self):
+        """Returns the zone to the state it was created in, so it can be shown again"""
+        self.wasHovering = False
+        self.reset_timers()
+        self.textColor=RESTING_TEXT_COLOR
+        self.sinceInteractedTimer = 0
+
+    def reset_timers(self):
+        self.startTimer = 0
+        if self.modifierStartAwake:
+            self.repeatTimer=0
+        else:
+            self.repeatTimer=INFINITY
+
+    def park(self, keep_timers: bool):
+        """Called when the zone set is put aside to be shown again later, the zone comes back in its resting appearance"""
+        self.textColor=RESTING_TEXT_COLOR
+        self.sinceInteractedTimer = 0
+        if not keep_timers:
+            self.reset_timers()
+
     def deactivate(self):
-        self.repeatTimer=float("inf")
-        self.startTimer=float("inf")
+        self.repeatTimer=INFINITY
+        self.startTimer=INFINITY
         pass  
     
     def clear_timers(self):
-        self.repeatTimer=float("inf")
-        self.startTimer=float("inf")
-    def start_timers(self):
-        self.startTimer = time.time()
+        self.repeatTimer=INFINITY
+        self.startTimer=INFINITY
+    def start_timers(self, now=None):
+        self.startTimer = current_time() if now is None else now
         self.repeatTimer = 0
     
-    def add_to_map(self, map, id):
-        print('self.width', self.width)
-        for x in range(self.width):
-            for y in range(self.height):
-                position = (self.left + x, self.top + y)
-                map[position] = id
+    def add_to_index(self, index, id):
+        index.add(id, self.left, self.top, self.width, self.height)
     
 class TriggerZone(Zone):
+    __slots__ = ("action2", "triggerValue", "dirtyTrigger", "modifierForceOffRepeat", "modifierForceOnRepeat")
+
     def __init__(self, color, centre, name, ttype, action, warmup, repeatTime,modifiers:str,action2) -> None:
         super().__init__(color, centre, name, ttype, action, warmup, repeatTime,modifiers)
-        self.action2 = action2
+        self.action2 = compile_action(action2)
         self.triggerValue = False
         self.dirtyTrigger=False
         self.modifierForceOffRepeat = "force off repeat" in modifiers.lower()
         self.modifierForceOnRepeat = "force on repeat" in modifiers.lower()
         
-    def interact(self):
-        super().interact()
+    def interact(self, now=None):
+        super().interact(now)
         
         if self.dirtyTrigger:
             self.triggerValue = not self.triggerValue
             self.dirtyTrigger = False
         
+        # the trigger value already changed, so its action must not be dropped
         if self.triggerValue:
-            self.fire_interaction(self.action)
+            self.fire_interaction(self.action, False)
         else:
-            self.fire_interaction(self.action2)
+            self.fire_interaction(self.action2, False)
             
-    def update(self, isHovering: bool):
-        super().update(isHovering)   
+    def update(self, isHovering: bool, now=None):
+        if now is None:
+            now = current_time()
+        super().update(isHovering, now)   
         
         if (self.triggerValue):
-            self.textColor = rgba2hex(255,0,0,255)
+            self.textColor = TRIGGERED_TEXT_COLOR
 
-        if (time.time()-self.repeatTimer>=self.repeatTime and time.time()-self.startTimer>=self.warmup):            
-            self.interact()
+        # a late update fires once and restarts the repeat timer from now, missed repeats are not replayed
+        if (now-self.repeatTimer>=self.repeatTime and now-self.startTimer>=self.warmup):            
+            self.interact(now)
             
             if self.triggerValue==True:
                 if (self.repeatTime>0 or self.modifierForceOnRepeat):
-                    self.repeatTimer = time.time()
+                    self.repeatTimer = now
                 else:
                     self.clear_timers()
                     
@@ -148,16 +232,18 @@ class TriggerZone(Zone):
                 if (not self.modifierForceOffRepeat):
                     self.clear_timers()
                         
-    def on_hover_change(self,isHovering: bool):
-        super().on_hover_change(isHovering)
+    def on_hover_change(self,isHovering: bool, now=None):
+        if now is None:
+            now = current_time()
+        super().on_hover_change(isHovering, now)
         if self.triggerType != TriggerType.HOVER:
             return
         
         if isHovering:
             self.dirtyTrigger=True
-            self.start_timers()
+            self.start_timers(now)
         else:
-            if time.time()-self.startTimer<self.warmup:
+            if now-self.startTimer<self.warmup:
                 self.dirtyTrigger=False
                 if not self.modifierForceOffRepeat and not self.triggerValue:
                     self.clear_timers()
@@ -169,6 +255,11 @@ class TriggerZone(Zone):
         self.dirtyTrigger=True
         self.start_timers()
 
+    def reset_state(self):
+        super().reset_state()
+        self.triggerValue = False
+        self.dirtyTrigger = False
+
     def deactivate(self):
         super().deactivate()
         if self.triggerValue == True:
@@ -176,35 +267,40 @@ class TriggerZone(Zone):
             self.interact()
 
 class SimpleZone(Zone):
+    __slots__ = ()
+
     def __init__(self, color, centre, name, ttype, action, warmup, repeatTime,modifiers:str, dimensions: tuple[int, int]=None) -> None:
         if dimensions:
             super().__init__(color, centre, name, ttype, action, warmup, repeatTime,modifiers, dimensions[0], dimensions[1])
         else:
             super().__init__(color, centre, name, ttype, action, warmup, repeatTime,modifiers)
         
-    def interact(self):
-        super().interact()
+    def interact(self, now=None):
+        super().interact(now)
     
         self.fire_interaction(self.action)
             
-    def update(self, isHovering: bool):
-        super().update(isHovering)   
+    def update(self, isHovering: bool, now=None):
+        if now is None:
+            now = current_time()
+        super().update(isHovering, now)   
 
-        if (time.time()-self.repeatTimer>=self.repeatTime and time.time()-self.startTimer>=self.warmup):            
-            self.interact()
+        # a late update fires once and restarts the repeat timer from now, missed repeats are not replayed
+        if (now-self.repeatTimer>=self.repeatTime and now-self.startTimer>=self.warmup):            
+            self.interact(now)
             
             if self.triggerType==TriggerType.HOVER:
-                self.repeatTimer = time.time()
+                self.repeatTimer = now
             else:
                 self.clear_timers()
                         
-    def on_hover_change(self,isHovering: bool):
-        super().on_hover_change(isHovering)
+    def on_hover_change(self,isHovering: bool, now=None):
+        super().on_hover_change(isHovering, now)
         if self.triggerType != TriggerType.HOVER:
             return
         
         if isHovering:
-            self.start_timers()
+            self.start_timers(now)
         else:
             self.clear_timers()
             